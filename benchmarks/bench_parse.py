@@ -0,0 +1,59 @@
+"""Compare webhook payload parsing paths on the recorded payloads.
+
+    python benchmarks/bench_parse.py [iterations]
+
+"dict" is the old path (json.loads, handlers read the nested dict);
+"event" is events.loads + PullRequestEvent (orjson when installed).
+"""
+import os
+import sys
+import glob
+import json
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from events import PullRequestEvent, loads, orjson
+
+PAYLOAD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "payloads")
+
+def dict_path(raw_body: bytes):
+    payload = json.loads(raw_body)
+    pull_request = payload["pull_request"]
+    # what handle_pr_event used to read
+    return (
+        payload["action"], payload["repository"]["full_name"], payload["number"], pull_request["html_url"],
+        pull_request["title"], pull_request["head"]["ref"], pull_request["base"]["ref"], pull_request["head"]["sha"],
+        pull_request["user"]["login"], payload["sender"]["login"], pull_request.get("merged"), payload,
+    )
+
+def event_path(raw_body: bytes):
+    return PullRequestEvent.from_payload(loads(raw_body))
+
+def measure(parse, raw_body: bytes, iterations: int) -> tuple[float, int, int]:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        parse(raw_body)
+    per_event_us = (time.perf_counter() - started) / iterations * 1e6
+
+    tracemalloc.start()
+    kept = parse(raw_body)  # what stays alive while the event waits / is handled
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return per_event_us, peak, retained
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print(f"parser: {'orjson' if orjson else 'json (install orjson for the fast path)'}, {iterations} iterations\n")
+    print(f"{'payload':<32}{'size':>8}  {'path':<6}{'µs/event':>10}{'peak KB':>10}{'kept KB':>10}")
+    for path in sorted(glob.glob(os.path.join(PAYLOAD_DIR, "*.json"))):
+        with open(path, "rb") as f:
+            raw_body = f.read()
+        name = os.path.basename(path)
+        for label, parse in (("dict", dict_path), ("event", event_path)):
+            per_event_us, peak, retained = measure(parse, raw_body, iterations)
+            print(f"{name:<32}{len(raw_body) // 1024:>6}KB  {label:<6}{per_event_us:>10.1f}{peak / 1024:>10.1f}{retained / 1024:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""End-to-end webhook benchmark against local GitHub / Slack / Zoho stand-ins.
+
+    python benchmarks/bench_webhooks.py --rounds 10 --concurrency 20 --github-latency 80 --slack-latency 60 --zoho-latency 150
+
+Replays every pull_request action handled by handle_pr_event (plus a
+pull_request_review) built from the recorded payloads in payloads/, and
+reports throughput, p50/p99 ack and notify latency and outbound calls per
+event. "Ack" is the /webhook round trip; "notify" runs from the moment the
+webhook is sent until its Slack post (or, for reviews, its Zoho status
+update) reaches the fake upstream.
+
+The service runs in-process under uvicorn; the fakes run on their own threads.
+Tuning variables (WEBHOOK_WORKERS, MENTION_FANOUT, ...) are read from the
+environment as usual.
+"""
+import os
+import sys
+import copy
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import tempfile
+from collections import defaultdict
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_upstreams import FakeUpstreams, PORTAL_NAME, PROJECTS, TASKS_PER_PROJECT
+
+PAYLOAD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "payloads")
+PR_ACTIONS = [
+    "opened", "reopened", "synchronize", "edited", "converted_to_draft", "ready_for_review", "closed",
+    "locked", "unlocked", "labeled", "unlabeled", "auto_merge_enabled", "auto_merge_disabled",
+    "assigned", "unassigned", "milestoned", "demilestoned", "enqueued", "dequeued",
+    "review_requested", "review_request_removed",
+]
+REVIEW = "pull_request_review"
+
+def load_payload(name: str) -> dict:
+    with open(os.path.join(PAYLOAD_DIR, name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def build_event(action: str, number: int, opened: dict, closed: dict) -> tuple[str, bytes]:
+    """Turn a recorded payload into ``action`` for PR ``number`` (head branch HI1-T<number>)."""
+    payload = copy.deepcopy(closed if action == "closed" else opened)
+    pull_request = payload["pull_request"]
+    repo = payload["repository"]["full_name"]
+    payload["action"] = action
+    payload["number"] = pull_request["number"] = number
+    pull_request["html_url"] = f"https://github.com/{repo}/pull/{number}"
+    pull_request["head"]["ref"] = f"HI1-T{number}"
+    pull_request["head"]["sha"] = f"{number:040x}"
+    reviewer = pull_request["requested_reviewers"][0] if pull_request["requested_reviewers"] else payload["sender"]
+
+    if action in ("labeled", "unlabeled"):
+        payload["label"] = pull_request["labels"][0]
+    elif action in ("assigned", "unassigned"):
+        payload["assignee"] = reviewer
+    elif action == "review_request_removed":
+        payload["requested_reviewer"] = reviewer
+    elif action == "milestoned":
+        pull_request["milestone"] = {"title": "Sprint 42", "due_on": "2025-06-01T07:00:00Z"}
+    elif action == "demilestoned":
+        payload["milestone"] = {"title": "Sprint 42", "due_on": "2025-06-01T07:00:00Z"}
+    elif action == "edited":
+        payload["changes"] = {"title": {"from": pull_request["title"][:-1]}}
+    elif action == "converted_to_draft":
+        pull_request["draft"] = True
+    elif action == "closed":
+        pull_request["merged_at"] = pull_request["closed_at"] = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    elif action == REVIEW:
+        payload["action"] = "submitted"
+        payload["review"] = {"id": number, "state": "changes_requested", "user": reviewer, "body": "Please split this up."}
+        return REVIEW, json.dumps(payload).encode()
+    return "pull_request", json.dumps(payload).encode()
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def configure_environment(base_url: str, args, workdir: str):
+    os.environ.update({
+        "GITHUB_API_BASE": f"{base_url}/github",
+        "CONTENT_URL": f"{base_url}/github/config/",
+        "SLACK_API_URL": f"{base_url}/slack",
+        "ZOHO_API_URL": f"{base_url}/zoho/restapi",
+        "ZOHO_ACCOUNTS_URL": f"{base_url}/zoho-accounts",
+        "ZOHO_TASK_INDEX_PATH": os.path.join(workdir, "zoho_task_index.json"),
+        "CONFIG_CACHE_DIR": os.path.join(workdir, "config_cache"),
+    })
+    for name, value in {
+        "GITHUB_TOKEN": "bench", "SLACK_BOT_PR_REVIEW_TOKEN": "bench", "ZOHO_CLIENT_ID": "bench", "ZOHO_CLIENT_SECRET": "bench",
+        "ZOHO_PORTAL_NAME": PORTAL_NAME, "SLACK_CHANNEL": "C_BENCH", "SLACK_CHANNEL_READY_FOR_QA": "C_QA",
+        "MEMBER_NOTIFY_QA": '["qa@example.com"]', "AUTHOR_EMAIL": "devops@example.com",
+        "WEBHOOK_QUEUE_BACKEND": "memory", "WEBHOOK_DEDUPE_PATH": "", "CONFIG_REFRESH_INTERVAL": "0",
+        "SLACK_CHANNEL_RATE": str(args.slack_rate), "SLACK_CHANNEL_BURST": str(max(1, int(args.slack_rate))),
+    }.items():
+        os.environ.setdefault(name, value)
+    if not args.coalesce:
+        os.environ["COALESCE_WINDOWS"] = json.dumps({action: 0 for action in PR_ACTIONS})
+
+async def wait_until_idle(client, fakes: FakeUpstreams, expected: set, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        stats = (await client.get("/queue")).json()
+        idle = stats["depth"] == 0 and stats["in_flight"] == 0 and stats["coalescing"] == 0 and stats["slack"]["queued"] == 0
+        if idle and expected <= set(fakes.notified):
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+async def replay(client, events: list, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    acks = {}
+
+    async def send(key, event_type, body):
+        async with semaphore:
+            sent_at = time.perf_counter()
+            response = await client.post("/webhook", content=body, headers={
+                "Content-Type": "application/json",
+                "X-GitHub-Event": event_type,
+                "X-GitHub-Delivery": str(uuid.uuid4()),
+            })
+            acks[key] = (sent_at, time.perf_counter(), response.status_code)
+
+    await asyncio.gather(*(send(key, event_type, body) for key, _, event_type, body in events))
+    return acks
+
+async def run(args):
+    import httpx
+    import uvicorn
+
+    fakes = FakeUpstreams(
+        latency={"github": args.github_latency / 1000, "slack": args.slack_latency / 1000, "zoho": args.zoho_latency / 1000},
+        team_map={"acme-dev/backend": ["lead1@example.com", "lead2@example.com"]},
+        user_emails={"jdoe": "jdoe@example.com", "asmith": "asmith@example.com", "lchen": "lchen@example.com"},
+    )
+    fake_port = fakes.start()
+    workdir = tempfile.mkdtemp(prefix="pr-watcher-bench-")
+    configure_environment(f"http://127.0.0.1:{fake_port}", args, workdir)
+
+    import main  # reads the environment at import time
+
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=args.port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    opened, closed = load_payload("pull_request_opened.json"), load_payload("pull_request_closed.json")
+    actions = PR_ACTIONS + [REVIEW]
+    total = (args.rounds + args.warmup) * len(actions)
+    if total > PROJECTS * TASKS_PER_PROJECT:
+        raise SystemExit(f"At most {PROJECTS * TASKS_PER_PROJECT // len(actions) - args.warmup} rounds fit the fake Zoho task list.")
+
+    def make_round(start: int) -> list:
+        events = []
+        for offset, action in enumerate(actions):
+            number = start + offset
+            event_type, body = build_event(action, number, opened, closed)
+            if action == "closed":
+                fakes.merged_prs.insert(0, {
+                    "title": f"HI1-T{number}", "head": {"ref": f"HI1-T{number}"},
+                    "updated_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    "merged_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                })
+            key = ("task", number) if action == REVIEW else ("pr", number)
+            events.append((key, action, event_type, body))
+        return events
+
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=60) as client:
+            for _ in range(60):
+                if (await client.get("/ready")).status_code == 200:
+                    break
+                await asyncio.sleep(0.5)
+            else:
+                raise SystemExit("Service never became ready; check the fake upstream wiring.")
+
+            # Warm-up: fills the Zoho task index, Slack ID cache and connection pools
+            number = 1
+            for _ in range(args.warmup):
+                events = make_round(number)
+                number += len(events)
+                await replay(client, events, args.concurrency)
+                await wait_until_idle(client, fakes, {key for key, *_ in events}, args.timeout)
+            fakes.reset_counters()
+
+            events = []
+            for _ in range(args.rounds):
+                events += make_round(number)
+                number += len(actions)
+            started = time.perf_counter()
+            acks = await replay(client, events, args.concurrency)
+            completed = await wait_until_idle(client, fakes, {key for key, *_ in events}, args.timeout)
+            finished = time.perf_counter()
+    finally:
+        server.should_exit = True
+        await server_task
+        fakes.stop()
+
+    report(events, acks, fakes, finished - started, completed)
+
+def report(events: list, acks: dict, fakes: FakeUpstreams, elapsed: float, completed: bool):
+    ack_ms, notify_ms = [], []
+    per_action = defaultdict(list)
+    rejected = 0
+    for key, action, _, _ in events:
+        sent_at, acked_at, status = acks[key]
+        rejected += status != 200
+        ack_ms.append((acked_at - sent_at) * 1000)
+        if key in fakes.notified:
+            latency = (fakes.notified[key] - sent_at) * 1000
+            notify_ms.append(latency)
+            per_action[action].append(latency)
+
+    count = len(events)
+    print(f"\nEvents: {count}   wall: {elapsed:.2f}s   throughput: {count / elapsed:.1f} events/s"
+          f"{'' if completed else '   (timed out before every event was delivered)'}")
+    print(f"Rejected (non-200 ack): {rejected}   missing notifications: {count - len(notify_ms)}")
+    print(f"Ack latency     p50 {percentile(ack_ms, 50):8.1f} ms   p99 {percentile(ack_ms, 99):8.1f} ms")
+    print(f"Notify latency  p50 {percentile(notify_ms, 50):8.1f} ms   p99 {percentile(notify_ms, 99):8.1f} ms")
+
+    total_calls = sum(fakes.calls.values())
+    print(f"\nOutbound calls per event: {total_calls / count:.2f}  "
+          + "  ".join(f"{name}={fakes.calls[name] / count:.2f}" for name in ("github", "slack", "zoho")))
+    print("\nBusiest routes:")
+    for (upstream, method, route), calls in fakes.routes.most_common(10):
+        print(f"  {calls:6d}  {upstream:<7}{method:<5}/{route}")
+
+    print(f"\n{'action':<26}{'p50 ms':>10}{'p99 ms':>10}")
+    for action in PR_ACTIONS + [REVIEW]:
+        values = per_action.get(action, [])
+        print(f"{action:<26}{percentile(values, 50):>10.1f}{percentile(values, 99):>10.1f}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rounds", type=int, default=10, help="times every action is replayed")
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured rounds before the run")
+    parser.add_argument("--concurrency", type=int, default=20, help="webhooks in flight at once")
+    parser.add_argument("--github-latency", type=float, default=50, help="ms per fake GitHub call")
+    parser.add_argument("--slack-latency", type=float, default=50, help="ms per fake Slack call")
+    parser.add_argument("--zoho-latency", type=float, default=100, help="ms per fake Zoho call")
+    parser.add_argument("--slack-rate", type=float, default=1000, help="SLACK_CHANNEL_RATE for the run (real Slack: 1)")
+    parser.add_argument("--coalesce", action="store_true", help="keep the default coalescing windows")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds to wait for delivery")
+    parser.add_argument("--port", type=int, default=8765)
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))
@@ -0,0 +1,171 @@
+"""Local stand-ins for the GitHub, Slack and Zoho APIs used by the benchmarks.
+
+Each upstream lives under its own path prefix on one threaded HTTP server:
+``/github``, ``/slack``, ``/zoho`` (Projects REST API) and ``/zoho-accounts``
+(OAuth). Every request sleeps for its upstream's configured latency, is
+counted, and Slack posts / Zoho status updates are timestamped so the
+harness can measure end-to-end notify latency.
+"""
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import Counter
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+PORTAL_NAME = "bench"
+PORTAL_ID = "1000"
+PROJECTS = 3
+TASKS_PER_PROJECT = 400  # tasks HI1-T0 .. HI1-T1199, task id == number
+
+PR_NUMBER = re.compile(r"/pull/(\d+)")
+
+class FakeUpstreams:
+    def __init__(self, latency: dict | None = None, team_map: dict | None = None, user_emails: dict | None = None):
+        self.latency = {"github": 0.0, "slack": 0.0, "zoho": 0.0, **(latency or {})}  # seconds
+        self.config = {
+            "repo_team_map.json": team_map or {},
+            "user_map_emails.json": user_emails or {},
+        }
+        self.calls = Counter()          # upstream -> requests
+        self.routes = Counter()         # (upstream, method, route) -> requests
+        self.notified = {}              # PR number / Zoho task id -> first notify time (perf_counter)
+        self.merged_prs = []            # closed PRs served by GET /pulls
+        self._lock = threading.Lock()
+        self._server = None
+
+    # --- server lifecycle -------------------------------------------------
+
+    def start(self, port: int = 0) -> int:
+        upstreams = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+
+            def do_GET(self):
+                upstreams._handle(self, "GET")
+
+            def do_POST(self):
+                upstreams._handle(self, "POST")
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address[1]
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def reset_counters(self):
+        with self._lock:
+            self.calls.clear()
+            self.routes.clear()
+            self.notified.clear()
+
+    # --- request handling -------------------------------------------------
+
+    def _handle(self, request: BaseHTTPRequestHandler, method: str):
+        url = urlsplit(request.path)
+        length = int(request.headers.get("Content-Length") or 0)
+        body = request.rfile.read(length) if length else b""
+        upstream, _, path = url.path.lstrip("/").partition("/")
+        latency_key = "zoho" if upstream == "zoho-accounts" else upstream
+
+        time.sleep(self.latency.get(latency_key, 0))
+        handler = getattr(self, f"_{upstream.replace('-', '_')}", None)
+        status, data, headers = handler(method, "/" + path, parse_qs(url.query), body, request.headers) if handler else (404, {}, {})
+        with self._lock:
+            self.calls[latency_key] += 1
+            self.routes[(latency_key, method, re.sub(r"(?<=/)\d+(?=/|$)", ":id", path))] += 1
+
+        payload = b"" if status == 304 else (data if isinstance(data, bytes) else json.dumps(data).encode())
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(payload)))
+        for name, value in headers.items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(payload)
+
+    def _mark(self, key):
+        with self._lock:
+            self.notified.setdefault(key, time.perf_counter())
+
+    def _github(self, method, path, query, body, headers):
+        rate = {"X-RateLimit-Remaining": "4999", "X-RateLimit-Reset": str(int(time.time()) + 3600)}
+        if path.startswith("/config/"):
+            data = json.dumps(self.config.get(path.rsplit("/", 1)[-1], {})).encode()
+            etag = f'"{hashlib.sha1(data).hexdigest()}"'
+            if headers.get("If-None-Match") == etag:
+                return 304, b"", {"ETag": etag}
+            return 200, data, {"ETag": etag}
+        if re.fullmatch(r"/repos/[^/]+/[^/]+/pulls", path):
+            page = int(query.get("page", ["1"])[0])
+            per_page = int(query.get("per_page", ["30"])[0])
+            return 200, self.merged_prs[(page - 1) * per_page: page * per_page], rate
+        match = re.fullmatch(r"/repos/[^/]+/[^/]+/pulls/(\d+)", path)
+        if match:
+            return 200, {"number": int(match.group(1)), "mergeable": True, "merge_commit_sha": "f" * 40}, rate
+        if re.fullmatch(r"/repos/[^/]+/[^/]+/(git/)?commits/\w+", path):
+            return 200, {"parents": [{"sha": "a" * 40}], "verification": {"signature": None}}, rate
+        return 404, {"message": "Not Found"}, rate
+
+    def _slack(self, method, path, query, body, headers):
+        if path == "/users.lookupByEmail":
+            email = query.get("email", [""])[0]
+            return 200, {"ok": True, "user": {"id": "U" + hashlib.md5(email.encode()).hexdigest()[:8].upper()}}, {}
+        if path in ("/chat.postMessage", "/chat.update"):
+            message = json.loads(body or b"{}")
+            if path == "/chat.postMessage":
+                for number in PR_NUMBER.findall(json.dumps(message)):
+                    self._mark(("pr", int(number)))
+            return 200, {"ok": True, "channel": message.get("channel"), "ts": f"{time.time():.6f}"}, {}
+        return 404, {"ok": False, "error": "unknown_method"}, {}
+
+    def _zoho_accounts(self, method, path, query, body, headers):
+        return 200, {"access_token": "bench-token", "expires_in": 3600}, {}
+
+    def _zoho(self, method, path, query, body, headers):
+        if path == "/restapi/portals/":
+            return 200, {"portals": [{"name": PORTAL_NAME, "id": PORTAL_ID}]}, {}
+        if re.fullmatch(r"/restapi/portal/\d+/projects/", path):
+            return 200, {"projects": [{"id": str(p), "name": f"Project {p}", "updated_date_long": 1} for p in range(PROJECTS)]}, {}
+        match = re.fullmatch(r"/restapi/portal/\d+/projects/(\d+)/tasks/", path)
+        if match and method == "GET":
+            project = int(match.group(1))
+            index = int(query.get("index", ["1"])[0])
+            size = int(query.get("range", ["100"])[0])
+            first = project * TASKS_PER_PROJECT
+            numbers = range(first, first + TASKS_PER_PROJECT)[index - 1: index - 1 + size]
+            return 200, {"tasks": [self._task(n) for n in numbers]}, {}
+        match = re.fullmatch(r"/restapi/portal/\d+/projects/\d+/tasks/(\d+)/", path)
+        if match and method == "POST":
+            self._mark(("task", int(match.group(1))))
+            return 200, {"tasks": [self._task(int(match.group(1)))]}, {}
+        if re.fullmatch(r"/restapi/portal/\d+/search", path):
+            term = query.get("search_term", [""])[0]
+            tasks = [
+                {**self._task(n), "project": {"id": str(n // TASKS_PER_PROJECT)}}
+                for n in range(PROJECTS * TASKS_PER_PROJECT)
+                if term and term in f"HI1-T{n} Benchmark task"  # substring match, like Zoho's
+            ][:100]
+            return (200, {"tasks": tasks}, {}) if tasks else (204, b"", {})
+        if re.fullmatch(r"/restapi/portal/\d+/projects/\d+/tasks/\d+/comments/", path):
+            return 200, {"comments": []}, {}
+        return 404, {"error": {"code": 6404, "message": "Not found"}}, {}
+
+    @staticmethod
+    def _task(number: int) -> dict:
+        return {
+            "id": str(number),
+            "key": f"HI1-T{number}",
+            "name": f"HI1-T{number} Benchmark task",
+            "link": {"web": {"url": f"https://projects.zoho.in/portal/{PORTAL_NAME}#task/{number}"}},
+        }
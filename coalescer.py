@@ -0,0 +1,138 @@
+import os
+import json
+import time
+import heapq
+import asyncio
+
+# Debounce window (seconds) per PR action; actions not listed here are handled immediately.
+DEFAULT_COALESCE_WINDOWS = {
+    "labeled": 1.2,
+    "unlabeled": 1.2,
+    "synchronize": 10,
+    "edited": 5,
+    "review_requested": 3,
+    "assigned": 3,
+}
+COALESCE_WINDOWS = {**DEFAULT_COALESCE_WINDOWS, **json.loads(os.getenv("COALESCE_WINDOWS", "{}"))}
+COALESCE_MAX_DELAY = float(os.getenv("COALESCE_MAX_DELAY", "30"))
+
+# Actions that share one buffer (and therefore one message)
+ACTION_GROUPS = {"labeled": "labels", "unlabeled": "labels"}
+
+def _merge(bucket: dict, event):
+    """Fold one event into its bucket. The newest event wins; per-action extras are accumulated."""
+    action = event.action
+    coalesced = bucket["coalesced"]
+    coalesced["count"] += 1
+
+    if action in ("labeled", "unlabeled"):
+        label_name = event.label or ""
+        opposite = "unlabeled" if action == "labeled" else "labeled"
+        if label_name in coalesced[opposite]:
+            coalesced[opposite].remove(label_name)  # added then removed (or vice versa) nets out
+        elif label_name not in coalesced[action]:
+            coalesced[action].append(label_name)
+    elif action == "edited":
+        bucket["changes"].extend(field for field in event.changes if field not in bucket["changes"])
+    elif action == "assigned":
+        if event.assignee and event.assignee not in coalesced["assignees"]:
+            coalesced["assignees"].append(event.assignee)
+
+    bucket["event"] = event
+
+def _build(bucket: dict):
+    event = bucket["event"].copy()
+    if bucket["changes"]:
+        event.changes = bucket["changes"]
+    event.coalesced = bucket["coalesced"]
+    return event
+
+class EventCoalescer:
+    """Per-PR debounce stage for bursty pull_request actions.
+
+    Events are buffered per ``(repo#pr, action group)`` and merged into a single
+    event once the group's window passes without new events (capped at
+    ``max_delay`` after the first one). All windows are served by one timer
+    loop over a deadline heap rather than a sleeping task per event.
+    """
+    def __init__(self, on_flush, windows: dict = COALESCE_WINDOWS, max_delay: float = COALESCE_MAX_DELAY):
+        self.on_flush = on_flush  # async (key, event) -> None
+        self.windows = windows
+        self.max_delay = max_delay
+        self._buckets: dict[tuple, dict] = {}
+        self._heap: list = []
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self.received = 0
+        self.flushed = 0
+
+    def handles(self, action: str) -> bool:
+        return self.windows.get(action, 0) > 0
+
+    def add(self, key: str, event):
+        action = event.action
+        bucket_key = (key, ACTION_GROUPS.get(action, action))
+        now = time.monotonic()
+        bucket = self._buckets.get(bucket_key)
+        if bucket is None:
+            bucket = self._buckets[bucket_key] = {
+                "first": now,
+                "changes": [],
+                "coalesced": {"count": 0, "labeled": [], "unlabeled": [], "assignees": []},
+            }
+        _merge(bucket, event)
+        self.received += 1
+
+        bucket["deadline"] = min(now + self.windows[action], bucket["first"] + self.max_delay)
+        heapq.heappush(self._heap, (bucket["deadline"], bucket_key))
+        if self._heap[0][1] == bucket_key:
+            self._wakeup.set()
+
+    def take(self, key: str) -> list:
+        """Remove and return every pending merged event for a PR, oldest first."""
+        pending = sorted(
+            (bucket_key for bucket_key in self._buckets if bucket_key[0] == key),
+            key=lambda bucket_key: self._buckets[bucket_key]["first"],
+        )
+        self.flushed += len(pending)
+        return [_build(self._buckets.pop(bucket_key)) for bucket_key in pending]
+
+    def pending(self) -> int:
+        return len(self._buckets)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        # Hand over whatever is still buffered so it is not lost on shutdown
+        for bucket_key in list(self._buckets):
+            await self._flush(bucket_key)
+
+    async def _flush(self, bucket_key: tuple):
+        bucket = self._buckets.pop(bucket_key, None)
+        if bucket is None:
+            return
+        self.flushed += 1
+        try:
+            await self.on_flush(bucket_key[0], _build(bucket))
+        except Exception as e:
+            print(f"[ERROR] Failed to flush coalesced events for {bucket_key[0]}: ", e)
+
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            while self._heap and self._heap[0][0] <= now:
+                deadline, bucket_key = heapq.heappop(self._heap)
+                bucket = self._buckets.get(bucket_key)
+                if bucket is not None and bucket["deadline"] == deadline:  # skip superseded entries
+                    await self._flush(bucket_key)
+
+            timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
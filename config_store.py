@@ -0,0 +1,110 @@
+import os
+import json
+import asyncio
+import hashlib
+from datetime import datetime, timezone
+from http_clients import get_client
+
+CONFIG_REFRESH_INTERVAL = float(os.getenv("CONFIG_REFRESH_INTERVAL", "300"))
+CONFIG_CACHE_DIR = os.getenv("CONFIG_CACHE_DIR", ".config_cache")
+
+class ConfigStore:
+    """Mapping files fetched from GitHub, revalidated with ETags and cached on disk.
+
+    Each file is swapped in as a whole new dict, so readers holding the old one
+    never see a half-updated map. The last good copy is kept under
+    ``cache_dir`` and used to boot without waiting for GitHub.
+    """
+    def __init__(self, base_url: str, headers: dict, filenames: list, cache_dir: str = CONFIG_CACHE_DIR):
+        self.base_url = base_url
+        self.headers = headers
+        self.cache_dir = cache_dir
+        self.files = {name: {"data": {}, "etag": None, "version": None, "source": "empty"} for name in filenames}
+        self.last_refresh = None
+        self._task = None
+        for name in filenames:
+            self._load_cached(name)
+
+    def get(self, filename: str) -> dict:
+        return self.files[filename]["data"]
+
+    def is_loaded(self) -> bool:
+        """True once every file has a copy, from GitHub or from the disk cache."""
+        return all(f["version"] for f in self.files.values())
+
+    def _cache_path(self, filename: str) -> str:
+        return os.path.join(self.cache_dir, filename)
+
+    def _load_cached(self, filename: str):
+        try:
+            with open(self._cache_path(filename), "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            self.files[filename] = {**cached, "source": "disk"}
+            print(f"📂 Loaded cached {filename} (version {cached.get('version')}).")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Could not read cached {filename}: {e}")
+
+    def _save_cached(self, filename: str, entry: dict):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self._cache_path(filename)}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({k: entry[k] for k in ("data", "etag", "version")}, f)
+            os.replace(tmp_path, self._cache_path(filename))
+        except Exception as e:
+            print(f"⚠️ Could not cache {filename}: {e}")
+
+    async def _refresh_file(self, filename: str) -> bool:
+        current = self.files[filename]
+        headers = dict(self.headers)
+        if current["etag"]:
+            headers["If-None-Match"] = current["etag"]
+        try:
+            response = await get_client("github").get(self.base_url + filename, headers=headers)
+            if response.status_code == 304:
+                return False
+            response.raise_for_status()
+            data = json.loads(response.text)
+        except Exception as e:
+            print(f"Failed to fetch {filename}: {e}")
+            return False
+
+        entry = {
+            "data": data,
+            "etag": response.headers.get("ETag"),
+            "version": hashlib.sha1(response.content).hexdigest()[:12],
+            "source": "github",
+        }
+        changed = entry["version"] != current["version"]
+        self.files[filename] = entry  # atomic swap
+        await asyncio.to_thread(self._save_cached, filename, entry)
+        if changed:
+            print(f"🔄 {filename} updated to version {entry['version']}.")
+        return changed
+
+    async def refresh(self) -> bool:
+        results = await asyncio.gather(*(self._refresh_file(name) for name in self.files))
+        self.last_refresh = datetime.now(timezone.utc)
+        return any(results)
+
+    async def _run(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await self.refresh()
+
+    def start(self, interval: float = CONFIG_REFRESH_INTERVAL):
+        if interval > 0:
+            self._task = asyncio.create_task(self._run(interval))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def versions(self) -> dict:
+        return {
+            "files": {name: {"version": f["version"], "source": f["source"]} for name, f in self.files.items()},
+            "last_refresh": self.last_refresh.isoformat() if self.last_refresh else None,
+        }
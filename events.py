@@ -0,0 +1,73 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib parser is used without it
+    orjson = None
+
+# Event type used when a coalesced event is handed back to the dispatcher
+COALESCED_EVENT = "pull_request.coalesced"
+
+def loads(raw_body: bytes):
+    return orjson.loads(raw_body) if orjson else json.loads(raw_body)
+
+def dumps(data) -> bytes:
+    return orjson.dumps(data) if orjson else json.dumps(data).encode()
+
+class PullRequestEvent:
+    """The handful of fields the handlers read from a pull_request(_review) webhook.
+
+    GitHub payloads are 20–60 KB of nested repository / user objects; keeping
+    only this record lets the parsed dict be dropped right after decoding.
+    """
+    __slots__ = (
+        "action", "repo", "number", "url", "title", "head_ref", "head_sha", "base_ref",
+        "author", "actor", "merged", "merged_at", "merge_commit_sha",
+        "label", "assignee", "requested_reviewer", "requested_reviewers", "milestone",
+        "changes", "review_state", "coalesced",
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "PullRequestEvent":
+        pull_request = payload["pull_request"]
+        milestone = pull_request.get("milestone")
+        return cls(
+            action=payload.get("action"),
+            repo=payload["repository"]["full_name"],
+            number=payload.get("number") or pull_request.get("number"),
+            url=pull_request["html_url"],
+            title=pull_request["title"],
+            head_ref=pull_request["head"]["ref"],
+            head_sha=pull_request["head"]["sha"],
+            base_ref=pull_request["base"]["ref"],
+            author=pull_request["user"]["login"],
+            actor=payload["sender"]["login"],
+            merged=pull_request.get("merged", False),
+            merged_at=pull_request.get("merged_at"),
+            merge_commit_sha=pull_request.get("merge_commit_sha"),
+            label=(payload.get("label") or {}).get("name"),
+            assignee=(payload.get("assignee") or {}).get("login"),
+            requested_reviewer=(payload.get("requested_reviewer") or {}).get("login"),
+            requested_reviewers=[reviewer["login"] for reviewer in pull_request.get("requested_reviewers") or []],
+            milestone={"title": milestone.get("title"), "due_on": milestone.get("due_on")} if milestone else None,
+            changes=list(payload.get("changes") or {}),
+            review_state=(payload.get("review") or {}).get("state"),
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PullRequestEvent":
+        return cls(**data)
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def copy(self) -> "PullRequestEvent":
+        return PullRequestEvent(**self.as_dict())
+
+    @property
+    def key(self) -> str:
+        return f"{self.repo}#{self.number}"
@@ -0,0 +1,130 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from urllib.parse import urlencode
+from http_clients import get_client
+
+GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
+GITHUB_API_BASE = os.getenv("GITHUB_API_BASE", "https://api.github.com")
+GITHUB_CACHE_SIZE = int(os.getenv("GITHUB_CACHE_SIZE", "500"))
+GITHUB_CACHE_FRESH_SECONDS = float(os.getenv("GITHUB_CACHE_FRESH_SECONDS", "5"))
+GITHUB_RATE_RESERVE = int(os.getenv("GITHUB_RATE_RESERVE", "200"))
+GITHUB_RATE_MAX_WAIT = float(os.getenv("GITHUB_RATE_MAX_WAIT", "300"))
+
+class GitHubClient:
+    """Cached GitHub REST reader.
+
+    Responses are kept per URL (LRU) and revalidated with ``If-None-Match`` /
+    ``If-Modified-Since``; GitHub does not charge 304s against the rate limit.
+    Within ``max_age`` seconds a cached body is served without any request,
+    and concurrent reads of the same URL share one request. The remaining
+    rate-limit budget is tracked from response headers: ``low`` priority reads
+    pause once it drops to ``GITHUB_RATE_RESERVE``, ``high`` priority reads
+    only when it is exhausted.
+    """
+    def __init__(self, token: str, max_entries: int = GITHUB_CACHE_SIZE, reserve: int = GITHUB_RATE_RESERVE):
+        self.token = token
+        self.max_entries = max_entries
+        self.reserve = reserve
+        self._cache = OrderedDict()  # url key -> {"etag", "last_modified", "data", "fetched_at", "immutable"}
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.rate_remaining = None
+        self.rate_reset_at = None
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(url: str, params: dict | None) -> str:
+        return f"{url}?{urlencode(sorted(params.items()))}" if params else url
+
+    async def get_json(self, url: str, params: dict | None = None, max_age: float = GITHUB_CACHE_FRESH_SECONDS,
+                       priority: str = "high", immutable: bool = False) -> tuple[int, object]:
+        """Return (status_code, json). Pass ``immutable=True`` for content addressed by SHA."""
+        key = self._key(url, params)
+        entry = self._cache.get(key)
+        if entry and (entry["immutable"] or time.monotonic() - entry["fetched_at"] <= max_age):
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return 200, entry["data"]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key, url, params, priority, immutable))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: str, url: str, params: dict | None, priority: str, immutable: bool):
+        await self._wait_for_budget(priority)
+        headers = {
+            "Authorization": f"token {self.token}",
+            "Accept": "application/vnd.github+json"
+        }
+        entry = self._cache.get(key)
+        if entry:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = await get_client("github").get(url, headers=headers, params=params)
+        self._track_rate_limit(response)
+
+        if response.status_code == 304 and entry:
+            self.revalidated += 1
+            entry["fetched_at"] = time.monotonic()
+            self._cache.move_to_end(key)
+            return 200, entry["data"]
+        if response.status_code != 200:
+            print(f"[ERROR] GitHub API error: {response.status_code} - {response.text}")
+            return response.status_code, None
+
+        self.misses += 1
+        data = response.json()
+        self._cache[key] = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "data": data,
+            "fetched_at": time.monotonic(),
+            "immutable": immutable,
+        }
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return 200, data
+
+    def _track_rate_limit(self, response):
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is not None:
+            self.rate_remaining = int(remaining)
+        if reset is not None:
+            self.rate_reset_at = int(reset)
+        if self.rate_remaining is not None and self.rate_remaining <= self.reserve:
+            print(f"[WARN] GitHub rate limit low: {self.rate_remaining} requests left.")
+
+    async def _wait_for_budget(self, priority: str):
+        if self.rate_remaining is None or self.rate_reset_at is None:
+            return
+        floor = 0 if priority == "high" else self.reserve
+        if self.rate_remaining > floor:
+            return
+        wait = self.rate_reset_at - time.time()
+        if wait > 0:
+            print(f"[WARN] GitHub budget at {self.rate_remaining}, pausing {priority} priority request for {wait:.0f}s.")
+            await asyncio.sleep(min(wait, GITHUB_RATE_MAX_WAIT))
+            self.rate_remaining = None  # unknown until the next response
+
+    def stats(self) -> dict:
+        return {
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "rate_remaining": self.rate_remaining,
+            "rate_reset_at": self.rate_reset_at,
+        }
+
+github = GitHubClient(GITHUB_TOKEN)
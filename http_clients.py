@@ -0,0 +1,70 @@
+import os
+import time
+import httpx
+from metrics import outbound_requests, outbound_seconds
+
+# Pool settings shared by every upstream client (override via env)
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "15"))
+
+UPSTREAMS = ("github", "slack", "zoho")
+
+_clients: dict[str, httpx.AsyncClient] = {}
+
+def _http2_available() -> bool:
+    if not HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401  (installed by httpx[http2])
+        return True
+    except ImportError:
+        print("⚠️ HTTP/2 requested but 'h2' is not installed, falling back to HTTP/1.1.")
+        return False
+
+class InstrumentedTransport(httpx.AsyncHTTPTransport):
+    """Records count and latency (until response headers) of every request per upstream and status."""
+    def __init__(self, upstream: str, **kwargs):
+        super().__init__(**kwargs)
+        self.upstream = upstream
+
+    async def handle_async_request(self, request):
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = await super().handle_async_request(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            outbound_requests.inc(upstream=self.upstream, status=status)
+            outbound_seconds.observe(time.perf_counter() - started, upstream=self.upstream, status=status)
+
+def _build_client(name: str) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+    transport = InstrumentedTransport(name, http2=_http2_available(), limits=limits)
+    return httpx.AsyncClient(transport=transport, timeout=HTTP_TIMEOUT)
+
+async def start_http_clients():
+    for name in UPSTREAMS:
+        if name not in _clients:
+            _clients[name] = _build_client(name)
+    print(f"🔌 HTTP clients ready: {', '.join(UPSTREAMS)}")
+
+async def close_http_clients():
+    while _clients:
+        name, client = _clients.popitem()
+        await client.aclose()
+    print("🔌 HTTP clients closed.")
+
+def get_client(name: str) -> httpx.AsyncClient:
+    """Return the pooled client for an upstream, creating it lazily outside the app lifetime."""
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = _clients[name] = _build_client(name)
+    return client
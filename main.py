@@ -3,21 +3,28 @@
 # Author: Ubaidullah Khan
 # License: 2025 - ?
 #########################################################################################
+import time
 import traceback
-from collections import defaultdict
-from datetime import datetime, timedelta
-import requests
 import os
 import json
 import asyncio
-import httpx
 from fastapi import FastAPI, Request, Header
+from fastapi.responses import JSONResponse, PlainTextResponse
 from dotenv import load_dotenv
-from utils import get_slack_id_by_email, send_slack_message
-from zoho_update import update_status_with_task_key, Read_For_QA
-
-# Temporary in-memory storage for debounce
-label_event_buffer = defaultdict(lambda: {"labeled": set(), "unlabeled": set(), "last_updated": datetime.utcnow()})
+from utils import get_slack_id_by_email, send_slack_message, update_slack_message, warm_slack_id_cache, gather_bounded, slack_dispatcher, slack_id_cache
+from utils import PRIORITY_HIGH, PRIORITY_NORMAL
+from http_clients import start_http_clients, close_http_clients
+from github_api import github, GITHUB_API_BASE
+from webhook_queue import WebhookDispatcher, DeliveryDeduper, PartitionedIntake, create_delivery_store
+from shared_state import shared_state
+from coalescer import EventCoalescer
+from config_store import ConfigStore
+from slack_templates import templates
+from pr_digest import DigestScheduler
+from events import PullRequestEvent, COALESCED_EVENT, loads, dumps
+import metrics
+from metrics import GaugeCallback, stage_seconds, webhook_deliveries, webhook_events
+from zoho_update import update_status_with_task_key, Read_For_QA, ensure_portal, record_merged_pr, token_manager, task_index
 
 load_dotenv()
 
@@ -31,7 +38,13 @@ PR_Actions = [
 ]
 
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
+MERGEABLE_POLL_ATTEMPTS = int(os.getenv("MERGEABLE_POLL_ATTEMPTS", "6"))
+MERGEABLE_POLL_BASE_DELAY = float(os.getenv("MERGEABLE_POLL_BASE_DELAY", "1"))
+MENTION_FANOUT = int(os.getenv("MENTION_FANOUT", "8"))
+SLACK_ID_CACHE_WARMUP = os.getenv("SLACK_ID_CACHE_WARMUP", "false").lower() == "true"
 AUTHOR_EMAIL = os.getenv("AUTHOR_EMAIL")
+BOOTSTRAP_RETRY_MAX_DELAY = float(os.getenv("BOOTSTRAP_RETRY_MAX_DELAY", "60"))
+CONFIG_WAIT_TIMEOUT = float(os.getenv("CONFIG_WAIT_TIMEOUT", "10"))
 
 GITHUB_API_URL = os.getenv("CONTENT_URL")
 GITHUB_HEADERS = {
@@ -40,51 +53,132 @@ GITHUB_HEADERS = {
 }
 
 QA_Channel = os.getenv("SLACK_CHANNEL_READY_FOR_QA")
+def qa_member_emails() -> list:
+    return json.loads(os.getenv("MEMBER_NOTIFY_QA") or "[]")
+
 async def notify_qa_members():
-    QA_mentions_local = [] 
-    member_emails = os.getenv("MEMBER_NOTIFY_QA")
-    for email in json.loads(member_emails):
-        slack_id = await get_slack_id_by_email(email.strip())
-        if slack_id:
-            QA_mentions_local.append(f"<@{slack_id}>")
+    member_emails = qa_member_emails()
+    slack_ids = await gather_bounded([get_slack_id_by_email(email.strip()) for email in member_emails], MENTION_FANOUT)
+    QA_mentions_local = [f"<@{slack_id}>" for slack_id in slack_ids if slack_id]
 
     QA_mentions_local = ' '.join(QA_mentions_local) if QA_mentions_local else 'N/A'
     return QA_mentions_local
 
-QA_mentions = ""
-
-@app.on_event("startup")
-async def startup_event():
-    app.state.QA_mentions = await notify_qa_members()
+async def get_qa_mentions() -> str:
+    if app.state.QA_mentions is None:
+        mentions = await notify_qa_members()
+        if mentions != 'N/A' or not qa_member_emails():
+            app.state.QA_mentions = mentions  # otherwise Slack was unreachable: try again next time
+        return mentions
+    return app.state.QA_mentions
+
+async def bootstrap_step(name: str, step):
+    """Run one startup dependency until it succeeds, backing off between attempts."""
+    delay = 1
+    while True:
+        try:
+            if await step():
+                app.state.ready[name] = True
+                print(f"✅ Bootstrap step '{name}' ready.")
+                return
+        except Exception as e:
+            print(f"[ERROR] Bootstrap step '{name}' failed: ", e)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, BOOTSTRAP_RETRY_MAX_DELAY)
+
+async def load_config() -> bool:
+    await config_store.refresh()
+    if config_store.is_loaded():
+        app.state.config_ready.set()
+        return True
+    return False
+
+async def load_qa_mentions() -> bool:
+    mentions = await notify_qa_members()
+    if mentions == 'N/A' and qa_member_emails():
+        return False  # none of the configured emails resolved; retried with backoff
+    app.state.QA_mentions = mentions
     print("QA_mentions =", app.state.QA_mentions)
+    return True
 
-def fetch_config_file(filename):
-    url = GITHUB_API_URL + filename
-    try:
-        response = requests.get(url, headers=GITHUB_HEADERS)
-        response.raise_for_status()
-        return json.loads(response.text)
-    except Exception as e:
-        print(f"Failed to fetch {filename}: {e}")
-        return {}
+async def bootstrap():
+    steps = {"config": load_config, "zoho_portal": ensure_portal, "qa_mentions": load_qa_mentions}
+    await asyncio.gather(*(bootstrap_step(name, step) for name, step in steps.items()))
+    if SLACK_ID_CACHE_WARMUP:
+        await warm_slack_id_cache(get_user_map_emails().values())
 
-# def get_repo_team_map():
-    # return fetch_config_file("repo_team_map.json")
-
-# def get_user_map_emails():
-    # return fetch_config_file("user_map_emails.json")
-# Load mapping files
-# with open("repo_team_map.json", "r") as f:
-    # repo_team_map = json.load(f)
-
-# with open("user_map_emails.json", "r") as f:
-    # user_map_emails = json.load(f)
-
-repo_team_map = fetch_config_file("repo_team_map.json")
-user_map_emails = fetch_config_file("user_map_emails.json")
+@app.on_event("startup")
+async def startup_event():
+    # Only local setup happens here; anything that talks to GitHub, Slack or Zoho runs in bootstrap()
+    started = time.perf_counter()
+    app.state.QA_mentions = None
+    app.state.ready = {"config": False, "zoho_portal": False, "qa_mentions": False}
+    app.state.config_ready = asyncio.Event()
+    app.state.config_wait_expired = False
+    if config_store.is_loaded():
+        app.state.config_ready.set()  # last good copy from disk is enough to start handling events
+    await start_http_clients()
+    app.state.dispatcher = WebhookDispatcher(handle_webhook, create_delivery_store())
+    # With a shared state backend each PR is owned by one worker; otherwise deliveries go straight to the dispatcher
+    app.state.intake = PartitionedIntake(app.state.dispatcher) if shared_state.is_shared else app.state.dispatcher
+    app.state.deduper = DeliveryDeduper()
+    await app.state.deduper.start()
+    await app.state.dispatcher.start()
+    if app.state.intake is not app.state.dispatcher:
+        await app.state.intake.start()
+    app.state.coalescer = EventCoalescer(submit_coalesced)
+    app.state.coalescer.start()
+    app.state.digest = DigestScheduler(digest_repos, send_digest)
+    app.state.digest.start()
+    config_store.start()
+    token_manager.start()
+    app.state.bootstrap = asyncio.create_task(bootstrap())
+    print(f"🚀 Listening after {(time.perf_counter() - started) * 1000:.1f} ms; bootstrap continues in background.")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    app.state.bootstrap.cancel()
+    if app.state.intake is not app.state.dispatcher:
+        await app.state.intake.stop()  # release partitions first so flushed buffers go to their new owner
+    await app.state.coalescer.stop()
+    await app.state.dispatcher.drain()  # the flushed buffers are only in memory with the default store
+    await app.state.dispatcher.stop()
+    pollers = list(mergeable_pollers)
+    for task in pollers:
+        task.cancel()
+    await asyncio.gather(*pollers, return_exceptions=True)
+    await app.state.digest.stop()
+    await app.state.deduper.close()
+    await slack_dispatcher.drain()
+    await config_store.stop()
+    await token_manager.stop()
+    await close_http_clients()
+    await shared_state.close()
+
+# Mapping files live in the config repo; the last good copy is served from disk until GitHub answers
+config_store = ConfigStore(GITHUB_API_URL or "", GITHUB_HEADERS, ["repo_team_map.json", "user_map_emails.json"])
+
+def get_repo_team_map():
+    return config_store.get("repo_team_map.json")
+
+def get_repo_settings(repo_name: str) -> dict:
+    # A repo maps to its lead emails, or to {"leads": [...], "digest_interval": seconds, "digest_channel": id}
+    settings = get_repo_team_map().get(repo_name, [])
+    return settings if isinstance(settings, dict) else {"leads": settings}
+
+def digest_repos() -> dict:
+    """Repos that opted into periodic digests: repo -> (interval, channel)."""
+    repos = {}
+    for repo_name, settings in get_repo_team_map().items():
+        if isinstance(settings, dict) and settings.get("digest_interval"):
+            repos[repo_name] = (float(settings["digest_interval"]), settings.get("digest_channel") or os.getenv("SLACK_CHANNEL"))
+    return repos
+
+def get_user_map_emails():
+    return config_store.get("user_map_emails.json")
 
 def resolve_email_from_username(username: str) -> str | None:
-    return user_map_emails.get(username)
+    return get_user_map_emails().get(username)
 
 async def resolve_slack_mention(username: str) -> str:
     email = resolve_email_from_username(username)
@@ -97,602 +191,428 @@ async def resolve_slack_mention(username: str) -> str:
 @app.get("/health", tags=["Health Check"])
 async def health_check():
     return {"status": "ok", "service": "GitHub PR Watcher"}
-    
+
+@app.get("/ready", tags=["Health Check"])
+async def readiness_check():
+    ready = all(app.state.ready.values())
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, "steps": app.state.ready})
+
+@app.get("/config/version", tags=["Health Check"])
+async def config_version():
+    return config_store.versions()
+
+@app.get("/queue", tags=["Health Check"])
+async def queue_stats():
+    return {**app.state.dispatcher.stats(), "coalescing": app.state.coalescer.pending(),
+            "dedupe": app.state.deduper.stats(),
+            "digest": app.state.digest.stats(),
+            "partitions": app.state.intake.stats() if app.state.intake is not app.state.dispatcher else None,
+            "github": github.stats(),
+            "slack": {"queued": slack_dispatcher.depth(), "sent": slack_dispatcher.sent, "digested": slack_dispatcher.digested}}
+
+def cache_counts() -> dict:
+    return {
+        ("github", "hit"): github.hits,
+        ("github", "revalidated"): github.revalidated,
+        ("github", "miss"): github.misses,
+        ("slack_id", "hit"): slack_id_cache.hits,
+        ("slack_id", "miss"): slack_id_cache.misses,
+        ("zoho_task_index", "hit"): task_index.hits,
+        ("zoho_task_index", "miss"): task_index.misses,
+    }
+
+def cache_hit_ratios() -> dict:
+    # Share of lookups answered without any upstream request
+    ratios = {}
+    for cache in ("github", "slack_id", "zoho_task_index"):
+        counts = {result: value for (name, result), value in cache_counts().items() if name == cache}
+        total = sum(counts.values())
+        ratios[(cache,)] = counts["hit"] / total if total else None
+    return ratios
+
+GaugeCallback("webhook_queue_depth", "Accepted webhooks waiting for a worker.", lambda: app.state.dispatcher.depth)
+GaugeCallback("webhook_in_flight", "Webhooks currently being handled.", lambda: app.state.dispatcher.in_flight)
+GaugeCallback("coalescer_pending", "Debounce buffers waiting to flush.", lambda: app.state.coalescer.pending())
+GaugeCallback("slack_outbound_queued", "Slack messages waiting for their channel's rate limit.", lambda: slack_dispatcher.depth())
+GaugeCallback("github_rate_limit_remaining", "GitHub API requests left in the current rate-limit window.", lambda: github.stats()["rate_remaining"])
+GaugeCallback("github_rate_limit_reset_timestamp", "Unix time the GitHub rate-limit window resets.", lambda: github.stats()["rate_reset_at"])
+GaugeCallback("github_cache_entries", "GitHub responses held in the ETag cache.", lambda: github.stats()["cached"])
+GaugeCallback("cache_requests_total", "Cache lookups by cache and result.", cache_counts, ("cache", "result"), kind="counter")
+GaugeCallback("cache_hit_ratio", "Share of cache lookups served without an upstream request.", cache_hit_ratios, ("cache",))
+
+@app.get("/metrics", tags=["Health Check"])
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+def parse_delivery(event_type: str, raw_body: bytes) -> PullRequestEvent | None:
+    """Parse a delivery once, on the ack path; the slim record also gives the dispatcher its ordering key."""
+    if event_type not in ("pull_request", "pull_request_review"):
+        return None  # dropped by handle_webhook without being read
+    try:
+        with stage_seconds.time(stage="parse"):
+            return PullRequestEvent.from_payload(loads(raw_body))
+    except Exception as e:
+        print("[WARN] Could not parse webhook payload: ", e)
+        return None
+
 @app.post("/webhook")
-async def github_webhook(request: Request, x_github_event: str = Header(None)):
+async def github_webhook(request: Request, x_github_event: str = Header(None), x_github_delivery: str = Header(None)):
+    # Redeliveries (automatic or from the webhook settings page) reuse the delivery ID
+    if x_github_delivery and not await app.state.deduper.claim(x_github_delivery):
+        webhook_deliveries.inc(result="duplicate")
+        return {"status": "duplicate"}
     raw_body = await request.body()
-    asyncio.create_task(handle_webhook(raw_body, x_github_event))
+    event = parse_delivery(x_github_event, raw_body)
+    # Events for the same PR share an ordering key and are handled one after another
+    if not await app.state.intake.submit(x_github_event, raw_body, event.key if event else "unkeyed", event):
+        if x_github_delivery:
+            await app.state.deduper.release(x_github_delivery)
+        webhook_deliveries.inc(result="busy")
+        return JSONResponse(status_code=503, content={"status": "busy"})
+    webhook_deliveries.inc(result="accepted")
     return {"status": "accepted"}
+
+async def submit_coalesced(pr_key: str, event: PullRequestEvent):
+    # A merged burst goes back through the dispatcher so it keeps the PR's ordering lane
+    if not await app.state.intake.submit(COALESCED_EVENT, dumps(event.as_dict()), pr_key, event):
+        print(f"[ERROR] Queue full, dropped coalesced {event.action} event for {pr_key}")
     
+async def get_pull_request(repo_name: str, pr_number: int, **kwargs) -> dict | None:
+    # Served from the shared GitHub cache, so every consumer within an event reuses one fetch
+    status, pr_data = await github.get_json(f"{GITHUB_API_BASE}/repos/{repo_name}/pulls/{pr_number}", **kwargs)
+    return pr_data if status == 200 else None
+
 async def get_email_of_merger(repo_name: str, pr_number: int) -> tuple[str | None, str | None]:
-    pr_api_url = f"https://api.github.com/repos/{repo_name}/pulls/{pr_number}"
-    headers = {"Authorization": f"token {GITHUB_TOKEN}"}
-    async with httpx.AsyncClient() as client:
-        pr_resp = await client.get(pr_api_url, headers=headers)
-        if pr_resp.status_code != 200:
-            return None, None
-        pr_data = pr_resp.json()
-        merge_commit_sha = pr_data.get("merge_commit_sha")
-        if not merge_commit_sha:
-            return None, None
-        commit_url = f"https://api.github.com/repos/{repo_name}/commits/{merge_commit_sha}"
-        commit_resp = await client.get(commit_url, headers=headers)
-        if commit_resp.status_code != 200:
-            return None, None
-        commit_data = commit_resp.json()
-        email = commit_data.get("commit", {}).get("author", {}).get("email")
-        login = commit_data.get("author", {}).get("login")
-        return email, login
-
-async def fetch_mergeable_state(repo_name: str, pr_number: int) -> str:
-    url = f"https://api.github.com/repos/{repo_name}/pulls/{pr_number}"
-    headers = {
-        "Authorization": f"token {GITHUB_TOKEN}",
-        "Accept": "application/vnd.github+json"
-    }
-    async with httpx.AsyncClient() as client:
-        for attempt in range(3):
-            response = await client.get(url, headers=headers)
-            if response.status_code != 200:
-                print(f"[ERROR] GitHub API error: {response.status_code} - {response.text}")
-                return "❓ Merge status fetch failed"
-            data = response.json()
-            mergeable = data.get("mergeable")
-            if mergeable is not None:
-                return "✅" if mergeable else "❌ `Has conflicts`"
-            print(f"[INFO] mergeable is null, retrying... ({attempt + 1}/3)")
-            await asyncio.sleep(1)
-    return "⏳ Merge status still unknown"
-
-async def handle_webhook(raw_body: bytes, event_type: str):
+    pr_data = await get_pull_request(repo_name, pr_number)
+    if not pr_data:
+        return None, None
+    merge_commit_sha = pr_data.get("merge_commit_sha")
+    if not merge_commit_sha:
+        return None, None
+    commit_url = f"{GITHUB_API_BASE}/repos/{repo_name}/commits/{merge_commit_sha}"
+    status, commit_data = await github.get_json(commit_url, immutable=True)
+    if status != 200:
+        return None, None
+    email = commit_data.get("commit", {}).get("author", {}).get("email")
+    login = commit_data.get("author", {}).get("login")
+    return email, login
+
+MERGE_STATUS_CHECKING = "⏳ Checking…"
+MERGE_STATUS_CONFLICTS = "❌ `Has conflicts`"
+MERGEABLE_ACTIONS = ["opened", "reopened", "synchronize", "edited", "converted_to_draft"]
+
+async def fetch_mergeable_state(repo_name: str, pr_number: int, priority: str = "high") -> str:
+    # Always revalidate: mergeable changes underneath us, but an unchanged PR costs only a free 304
+    data = await get_pull_request(repo_name, pr_number, max_age=0, priority=priority)
+    if data is None:
+        return "❓ Merge status fetch failed"
+    mergeable = data.get("mergeable")
+    if mergeable is not None:
+        return "✅" if mergeable else MERGE_STATUS_CONFLICTS
+    return MERGE_STATUS_CHECKING
+
+# (repo, pr_number, head_sha) -> callbacks waiting for the computed mergeable state
+mergeable_watchers: dict[tuple, list] = {}
+# Running pollers; referenced here so they are not garbage-collected mid-poll, cancelled on shutdown
+mergeable_pollers: set[asyncio.Task] = set()
+
+def watch_mergeable_state(repo_name: str, pr_number: int, head_sha: str, on_resolved):
+    """Poll GitHub in the background until `mergeable` is known, then call every waiter once."""
+    key = (repo_name, pr_number, head_sha)
+    if key in mergeable_watchers:
+        mergeable_watchers[key].append(on_resolved)  # a poll for this head is already running
+        return
+    mergeable_watchers[key] = [on_resolved]
+    task = asyncio.create_task(poll_mergeable_state(key))
+    mergeable_pollers.add(task)
+    task.add_done_callback(mergeable_pollers.discard)
+
+async def poll_mergeable_state(key: tuple):
+    repo_name, pr_number, _ = key
+    merge_status = "⏳ Merge status still unknown"
+    try:
+        delay = MERGEABLE_POLL_BASE_DELAY
+        for attempt in range(MERGEABLE_POLL_ATTEMPTS):
+            await asyncio.sleep(delay)
+            status = await fetch_mergeable_state(repo_name, pr_number, priority="low")
+            if status != MERGE_STATUS_CHECKING:
+                merge_status = status
+                break
+            print(f"[INFO] mergeable is null, polling again in {delay * 2:.0f}s ({attempt + 1}/{MERGEABLE_POLL_ATTEMPTS})")
+            delay *= 2
+    finally:
+        waiters = mergeable_watchers.pop(key, [])
+    for on_resolved in waiters:
+        try:
+            await on_resolved(merge_status)
+        except Exception as e:
+            print(f"[ERROR] Failed to update mergeable state for {repo_name}#{pr_number}: ", e)
+
+async def handle_webhook(raw_body: bytes, event_type: str, event: PullRequestEvent | None = None):
     try:
         # with open("payload.json", "w", encoding="utf-8") as f:
             # json.dump(json.loads(raw_body), f, indent=4, ensure_ascii=False)
-        payload = json.loads(raw_body)
-        if event_type == "pull_request":
-            print("Pull Request event Performed.")
-            action = payload.get("action")
-            # if action not in PR_Actions:
-                # return
-            await handle_pr_event(payload)
-        elif event_type == "pull_request_review":
-            print("Pull Request Review is Performed.")
-            await handle_pull_request_review(payload)
+        if event_type not in ("pull_request", "pull_request_review", COALESCED_EVENT):
+            webhook_events.inc(event=event_type, action="")
+            return
+        if not app.state.config_ready.is_set() and not app.state.config_wait_expired:
+            # Without team/user maps every mention would fall back to plain usernames
+            try:
+                await asyncio.wait_for(app.state.config_ready.wait(), CONFIG_WAIT_TIMEOUT)
+            except asyncio.TimeoutError:
+                # Waited once; later events go ahead right away until the maps load
+                app.state.config_wait_expired = True
+                print("[WARN] Mapping files still not loaded, handling events without them.")
+        if event is None:
+            # Replayed, or forwarded from another worker: parse here. Only the slim record is kept either way
+            with stage_seconds.time(stage="parse"):
+                if event_type == COALESCED_EVENT:
+                    event = PullRequestEvent.from_dict(loads(raw_body))
+                else:
+                    event = PullRequestEvent.from_payload(loads(raw_body))
+        webhook_events.inc(event=event_type, action=event.action)
+
+        with stage_seconds.time(stage="handle"):
+            if event_type == "pull_request":
+                print("Pull Request event Performed.")
+                # if event.action not in PR_Actions:
+                    # return
+                coalescer = app.state.coalescer
+                if coalescer.handles(event.action):
+                    coalescer.add(event.key, event)
+                    return
+                # Bursts still buffered for this PR happened before this event, so post them first
+                for pending_event in coalescer.take(event.key):
+                    await handle_pr_event(pending_event)
+                await handle_pr_event(event)
+            elif event_type == COALESCED_EVENT:
+                await handle_pr_event(event)
+            else:
+                print("Pull Request Review is Performed.")
+                await handle_pull_request_review(event)
     except Exception as e:
         print(f"[ERROR] Failed to process webhook: ", e)
         traceback.print_exc()
 
-async def handle_pull_request_review(payload: dict):
-    if payload["action"] == "submitted" and payload["review"]["state"] == "changes_requested":
-        print(update_status_with_task_key(payload["pull_request"]["head"]["ref"], "Changes Requested", f''))
+async def handle_pull_request_review(event: PullRequestEvent):
+    if event.action == "submitted" and event.review_state == "changes_requested":
+        print(await stage_seconds.timed(update_status_with_task_key(event.head_ref, "Changes Requested", f''), stage="zoho_update"))
     return
-async def handle_pr_event(payload: dict):
-    repo_name = payload["repository"]["full_name"]
-    pr_number = payload["number"]
-    pr_url = payload["pull_request"]["html_url"]
-    pr_author = payload["pull_request"]["user"]["login"]
-    pr_title = payload["pull_request"]["title"]
-    pr_head = payload["pull_request"]["head"]["ref"]
-    pr_base = payload["pull_request"]["base"]["ref"]
-    commit_sha = payload["pull_request"]["head"]["sha"]
-    short_commit = commit_sha[:7]
-    workflow_url = f"https://github.com/{repo_name}/pull/{pr_number}"
-    
-    PR_AUTHOR = payload["pull_request"]["user"]["login"]  # the one who originally opened the PR action username
-    PR_ACTOR = payload["sender"]["login"]  # the one who performed the
-    
-    # Team leads (if any)
-    team_leads = repo_team_map.get(repo_name, [])
-    team_lead_mentions = []
-    for email in team_leads:
-        slack_id = await get_slack_id_by_email(email)
-        if slack_id:
-            team_lead_mentions.append(f"<@{slack_id}>")
-    
-    team_lead_mentions = ' '.join(team_lead_mentions) if team_lead_mentions else 'N/A'
-    
-    # 🧠 Get PR author's email from commit history
-    PR_AUTHOR_SLACK = await resolve_slack_mention(PR_AUTHOR)
-    PR_ACTOR_SLACK = await resolve_slack_mention(PR_ACTOR)
-
-    # 🔍 Get mergeable status from GitHub
-    merge_status = ""
-    if payload['action'] != "closed":
-        merge_status = await fetch_mergeable_state(repo_name, pr_number)
-    
-    Message_in_Body = ""
-            
-    channel = os.getenv("SLACK_CHANNEL")
-    
-    if payload['action'] in ["opened", "reopened", "synchronize", "closed", "edited", "converted_to_draft"]:
-        action = payload['action']
-
-        # Slack formatting maps
-        emoji_map = {
-            "opened": ":rotating_light:",
-            "reopened": ":arrows_counterclockwise:",
-            "synchronize": ":rotating_light:",
-            "closed": ":lock:",
-            "edited": ":pencil2:",
-            "converted_to_draft": ":memo:"
-        }
-
-        header_map = {
-            "opened": "*New PR* opened",
-            "reopened": "PR was *reopened*",
-            "synchronize": "*New PR* updated",
-            "closed": "PR is *closed*",
-            "edited": "PR was *edited*",
-            "converted_to_draft": "PR was *converted to draft*"
-        }
-
-        status_map = {
-            "opened": "`Recently Created`",
-            "reopened": "`Reopened`",
-            "synchronize": "`Opened PR file edited / changed during active PR`",
-            "edited": None,
-            "closed": None,
-            "converted_to_draft": "`Draft Mode Enabled`"
-        }
-
-        # Logic for closed PR
-        if action == "closed":
-            # Determine who closed/merged the PR
-            # Get merger's email from the merge commit
-            merged = payload['pull_request'].get("merged", False)
-            merge_method_status = "Not Merged"
-
-            if merged:
-                pr_api_url = f"https://api.github.com/repos/{repo_name}/pulls/{pr_number}"
-                headers = {"Authorization": f"token {GITHUB_TOKEN}"}
-                async with httpx.AsyncClient() as client:
-                    pr_response = await client.get(pr_api_url, headers=headers)
-                    if pr_response.status_code == 200:
-                        pr_data = pr_response.json()
-                        merge_commit_sha = pr_data.get("merge_commit_sha")
-                        commit_api_url = f"https://api.github.com/repos/{repo_name}/git/commits/{merge_commit_sha}"
-                        commit_response = await client.get(commit_api_url, headers=headers)
-                        if commit_response.status_code == 200:
-                            commit_data = commit_response.json()
-                            parent_count = len(commit_data.get("parents", []))
-                            signature = commit_data.get("verification", {}).get("signature")
-
-                            if parent_count == 2:
-                                merge_method_status = "Merge Commit"
-                            elif parent_count == 1:
-                                merge_method_status = "Squash and Merged" if signature else "Rebase and Merged"
-                            else:
-                                merge_method_status = "Unknown Merge Type"
-                        else:
-                            merge_method_status = "Merged"
-                    else:
-                        merge_method_status = "Merged"
-
-            status_map["closed"] = f"`{'Closed Merged PR' if merged else 'Closed PR without merge'}`"
-            Message_in_Body = ""
-            # (
-                # f"This <{pr_url}|PR> was *{merge_method_status if merged else 'closed without merge'}* by {PR_ACTOR_SLACK}.\n"
-                # #f"`[TL]` {team_lead_mentions} Kindly review the <{pr_url}|PR> closed.\n"
-            # )
-
-        # Logic for edited PR
-        elif action == "edited":
-            edited_parts = []
-            changes = payload.get("changes", {})
-            if "title" in changes:
-                edited_parts.append("Title")
-            if "body" in changes:
-                edited_parts.append("Description")
-            if "base" in changes:
-                edited_parts.append("Base branch")
-            edit_summary = ", ".join(edited_parts) if edited_parts else "_Unknown edits_"
-            status_map["edited"] = f"`{edit_summary} Edited`"
-
-            if merge_status == "✅":
-                Message_in_Body = (
-                    f"`[TL]` {team_lead_mentions}, Please review this <{pr_url}|PR> now after edits by {PR_ACTOR_SLACK}."
-                )
-            elif merge_status == "❌ `Has conflicts`":
-                Message_in_Body = (
-                    f"`[TL]` {team_lead_mentions}, Please ask `[Developer]` {PR_ACTOR_SLACK} / {PR_AUTHOR_SLACK} to resolve this <{pr_url}| PR>."
-                )
-            else:
-                Message_in_Body = (
-                    f"`[TL]` {team_lead_mentions}, PR has been edited by {PR_ACTOR_SLACK}. Please review <{pr_url}|PR>."
-                )
-
-        # Logic for converted_to_draft PR
-        elif action == "converted_to_draft":
-            Message_in_Body = (
-                f"`[TL]` {team_lead_mentions}, This <{pr_url}|PR> has been converted to *Draft* mode.\n"
-            )
-
-        # Default logic for opened / reopened / synchronize
-        elif action in ["opened", "reopened", "synchronize"]:
-            if merge_status == "✅":
-                Message_in_Body = (
-                    f"`[TL]` {team_lead_mentions} "
-                    f"Kindly review this <{pr_url}| PR>{f' recently edited by the {PR_ACTOR_SLACK}.' if action == 'synchronize' else ''}"
-                )
-            elif merge_status == "❌ `Has conflicts`":
-                Message_in_Body = (
-                    f"`[TL]` {team_lead_mentions} "
-                    f"Please ask `[Developer]` {PR_ACTOR_SLACK} to resolve this <{pr_url}| PR>."
-                )
-            else:
-                Message_in_Body = (
-                    f"`[TL]` {team_lead_mentions} Please review this <{pr_url}| PR>."
-                )
-        fields = [
-            {"type": "mrkdwn", "text": f"*Commit:* <{workflow_url}|`{short_commit}`>"}
-        ]
-
-        if action != "closed":
-            fields.append({"type": "mrkdwn", "text": f"*Mergeable:* {merge_status}"})
-        
-        blocks = [
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": (
-                            f"{emoji_map[action]} {header_map[action]} by {PR_AUTHOR_SLACK if action != 'closed' else PR_ACTOR_SLACK}:\n"
-                            f":twisted_rightwards_arrows: *Branch:* `{pr_head}` → `{pr_base}`\n"
-                            f"Current Status: {status_map[action]}"
-                        )
-                    }
-                },
-                {
-                    "type": "section",
-                    "fields": fields
-                }
-        ]
-
-        if Message_in_Body.strip():  # only add if not empty or just whitespace
-            blocks.append({
-                "type": "section",
-                "text": {
-                    "type": "mrkdwn",
-                    "text": Message_in_Body
-                }
-            })
-        # Final Slack message structure
-        message = {
-            "channel": channel,
-            "text": f"{emoji_map[action]} Pull Request Notification",
-            "blocks": blocks
-        }
-
-        await send_slack_message(message) # Sample ID = HI1-T406
-        
-        if action == "opened":
-            print(update_status_with_task_key(pr_head, "Ready For Review", f'')) #New <a href="{pr_url}">PR</a> opened. Please review it.
-        elif action == "closed" and merged:
-            print(update_status_with_task_key(pr_head, "PR Merge", f''))
-            DATA = Read_For_QA(pr_head, repo_name, 7)
-            
-            if DATA != None:
-                message_lines = [f"{app.state.QA_mentions}\n*Kindly check these task(s) Ready For QA:*"]
-                for i, (key, task) in enumerate(DATA.items(), 1):
-                    task_link = task.get("link", "#")
-                    message_lines.append(f"{i}) <{task_link}|{key}>")
-                
-                final_message = "\n".join(message_lines)
-                message = {
-                            "channel": QA_Channel,
-                            "text": final_message,
-                          }
-                await send_slack_message(message)
-
-    elif payload['action'] in ["locked", "unlocked"]:
-        lock_action = payload['action']  # "locked" or "unlocked"
-        lock_emoji = ":lock:" if lock_action == "locked" else ":unlock:"
-        lock_text = "locked" if lock_action == "locked" else "unlocked"
-        lock_title = "PR Locked" if lock_action == "locked" else "PR Unlocked"
-
-        Message_in_Body = (
-            f"{lock_emoji} {lock_title}\n"
-            f"`[TL]` {team_lead_mentions} This <{pr_url}|PR> by opened by {PR_AUTHOR_SLACK} "
-            f"has been `{lock_text}` by {PR_ACTOR_SLACK}."
-        )
-
-        message = {
-            "channel": channel,
-            "text": f"{lock_emoji} {lock_title}",
-            "blocks": [
-                {
-                    "type": "section",
-                    "text": { "type": "mrkdwn", "text": Message_in_Body }
-                }
-            ]
-        }
-
-        await send_slack_message(message)
-
-    elif payload['action'] in ["labeled", "unlabeled"]:
-        repo_pr_key = f"{repo_name}#{pr_number}"
-        action_type = payload["action"]
-        label_name = payload.get("label", {}).get("name", "")
-        label_name = f"`{label_name}`"
-
-        # Add to buffer
-        label_event_buffer[repo_pr_key][action_type].add(label_name)
-        label_event_buffer[repo_pr_key]["last_updated"] = datetime.utcnow()
-
-        # Define async flush inside but only run in background
-        async def flush_labels_after_delay(repo_pr_key, repo_name, pr_number, pr_url, team_lead_mentions):
-            await asyncio.sleep(1.2)  # wait to accumulate events
-            now = datetime.utcnow()
-            last = label_event_buffer[repo_pr_key]["last_updated"]
-            if (now - last) >= timedelta(seconds=1.1):
-                added = label_event_buffer[repo_pr_key]["labeled"]
-                removed = label_event_buffer[repo_pr_key]["unlabeled"]
-
-                added_str = ", ".join(sorted(added)) if added else ""
-                removed_str = ", ".join(sorted(removed)) if removed else ""
-
-                summary_parts = []
-                if added_str:
-                    summary_parts.append(f"*added* {added_str}")
-                if removed_str:
-                    summary_parts.append(f"*removed* {removed_str}")
-
-                summary = " and ".join(summary_parts)
-
-                message = {
-                    "channel": channel,
-                    "text": "🏷️ Labels Updated on PR",
-                    "blocks": [
-                        {
-                            "type": "section",
-                            "text": {
-                                "type": "mrkdwn",
-                                "text": (
-                                    f"🏷️ Labels Updated on PR.\n"
-                                    f"`[TL]` {team_lead_mentions} Labels {summary} on this <{pr_url}|PR> by {PR_ACTOR_SLACK}.\n"
-                                )
-                            }
-                        }
-                    ]
-                }
-
-                await send_slack_message(message)
-                del label_event_buffer[repo_pr_key]
-
-        # Schedule the flush task only
-        asyncio.create_task(flush_labels_after_delay(repo_pr_key, repo_name, pr_number, pr_url, team_lead_mentions))
-
-    elif payload['action'] in ["auto_merge_enabled", "auto_merge_disabled"]:
-        action = payload['action']
-        # Dynamic values
-        title = "✅ Auto-Merge Enabled" if action == "auto_merge_enabled" else "🚫 Auto-Merge Disabled"
-        icon = ":white_check_mark:" if action == "auto_merge_enabled" else ":no_entry_sign:"
-        verb = "*enabled*" if action == "auto_merge_enabled" else "*disabled*"
-
-        message = {
-            "channel": channel,
-            "text": title,
-            "blocks": [
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": (
-                            f"{icon} Auto-merge was {verb} by {PR_ACTOR_SLACK} on this PR.\n"
-                            f":twisted_rightwards_arrows: *Branch:* `{pr_head}` → `{pr_base}`\n"
-                            f"`[TL]` {team_lead_mentions} Please have a look at this <{pr_url}|PR>."
-                        )
-                    }
-                }
-            ]
-        }
-
-        await send_slack_message(message)
-
-    elif payload['action'] in ["assigned", "unassigned"]:
-        action = payload['action']
-        assignee = payload["assignee"]["login"]
-        actor = payload["sender"]["login"]  # who performed the action
-
-        # Default mentions
-        assignee_mention = f"`{assignee}`"
-        actor_mention = f"`{actor}`"
-
-        # Attempt to resolve Slack IDs
-        assignee_email = await get_email_from_pr_commits(repo_name, pr_number)
-        actor_email = await get_email_from_pr_commits(repo_name, pr_number)
-        if assignee_email:
-            slack_id = await get_slack_id_by_email(assignee_email)
-            if slack_id:
-                assignee_mention = f"<@{slack_id}>"
-
-        if actor_email:
-            slack_id = await get_slack_id_by_email(actor_email)
-            if slack_id:
-                actor_mention = f"<@{slack_id}>"
-
-        tl_mentions = ' '.join(team_lead_mentions) if team_lead_mentions else "N/A"
-        verb = "*assigned*" if action == "assigned" else "*unassigned*"
-        emoji = ":heavy_plus_sign:" if action == "assigned" else ":heavy_division_sign:" 
-
-        message = {
-            "channel": channel,
-            "text": ":heavy_plus_sign: Pull Request Assigned" if action == "assigned" else ":heavy_division_sign: Pull Request Unassigned",
-            "blocks": [
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": (
-                            f"{emoji} {actor_mention} {verb} {assignee_mention} {'to' if action == 'assigned' else 'from'} this PR.\n"
-                            f":twisted_rightwards_arrows: *Branch:* `{pr_head}` → `{pr_base}`\n"
-                            f"{tl_mentions} please be informed about this <{pr_url}|PR>.\n"
-                        )
-                    }
-                }
-            ]
-        }
-        await send_slack_message(message)
-        
-    elif payload['action'] in ["milestoned", "demilestoned"]:
-        # Check if milestone exists in the PR payload
-        milestone = payload["pull_request"].get("milestone")
-        
-        # If there's no milestone, handle it gracefully for "demilestoned"
-        if milestone:
-            milestone_title = milestone.get("title", "unknown")
-            milestone_due_date = milestone.get("due_on", "No due date set")
+async def merge_method(repo_name: str, pr_number: int, merge_commit_sha: str | None) -> str:
+    # The closed event already carries the merge commit; only fall back to the API without it
+    if not merge_commit_sha:
+        pr_data = await get_pull_request(repo_name, pr_number)
+        merge_commit_sha = pr_data.get("merge_commit_sha") if pr_data else None
+    if not merge_commit_sha:
+        return "Merged"
+    commit_api_url = f"{GITHUB_API_BASE}/repos/{repo_name}/git/commits/{merge_commit_sha}"
+    status, commit_data = await github.get_json(commit_api_url, immutable=True)
+    if status != 200:
+        return "Merged"
+    parent_count = len(commit_data.get("parents", []))
+    signature = commit_data.get("verification", {}).get("signature")
+    if parent_count == 2:
+        return "Merge Commit"
+    if parent_count == 1:
+        return "Squash and Merged" if signature else "Rebase and Merged"
+    return "Unknown Merge Type"
+
+# Per-action context builders: add what the action's template needs, return False to skip the post
+
+async def closed_context(event: PullRequestEvent, ctx: dict, user_mentions: dict) -> bool:
+    merged = event.merged
+    ctx["merged"] = merged
+    ctx["merge_method"] = await merge_method(event.repo, event.number, event.merge_commit_sha) if merged else "Not Merged"
+    ctx["status"] = f"`{'Closed Merged PR' if merged else 'Closed PR without merge'}`"
+    return True
+
+async def edited_context(event: PullRequestEvent, ctx: dict, user_mentions: dict) -> bool:
+    edited_parts = [name for field, name in (("title", "Title"), ("body", "Description"), ("base", "Base branch")) if field in event.changes]
+    ctx["status"] = f"`{', '.join(edited_parts) if edited_parts else '_Unknown edits_'} Edited`"
+    return True
+
+async def synchronize_context(event: PullRequestEvent, ctx: dict, user_mentions: dict) -> bool:
+    pushes = (event.coalesced or {}).get("count", 1)
+    if pushes > 1:
+        ctx["status"] = f"`Opened PR file edited / changed during active PR ({pushes} pushes)`"
+    return True
+
+async def labels_context(event: PullRequestEvent, ctx: dict, user_mentions: dict) -> bool:
+    # Label bursts arrive already merged by the coalescer; a lone event is its own summary
+    if event.coalesced:
+        added, removed = event.coalesced["labeled"], event.coalesced["unlabeled"]
+    else:
+        label_name = event.label or ""
+        added, removed = ([label_name], []) if event.action == "labeled" else ([], [label_name])
+
+    summary_parts = []
+    if added:
+        summary_parts.append("*added* " + ", ".join(f"`{name}`" for name in sorted(added)))
+    if removed:
+        summary_parts.append("*removed* " + ", ".join(f"`{name}`" for name in sorted(removed)))
+    ctx["label_summary"] = " and ".join(summary_parts)
+    return bool(summary_parts)  # labels were added and removed again within the window
+
+async def assignees_context(event: PullRequestEvent, ctx: dict, user_mentions: dict) -> bool:
+    assignees = (event.coalesced or {}).get("assignees") or [event.assignee]
+    ctx["assignees"] = ", ".join(user_mentions[assignee] for assignee in assignees)
+    return True
+
+async def milestone_context(event: PullRequestEvent, ctx: dict, user_mentions: dict) -> bool:
+    milestone = event.milestone
+    ctx["milestone_title"] = (milestone["title"] or "unknown") if milestone else "No milestone"
+    ctx["milestone_due"] = (milestone["due_on"] or "No due date set") if milestone else "No due date set"
+    return True
+
+async def review_requested_context(event: PullRequestEvent, ctx: dict, user_mentions: dict) -> bool:
+    requested_mentions = [user_mentions[reviewer] for reviewer in event.requested_reviewers]
+    ctx["reviewers"] = ", ".join(requested_mentions) if requested_mentions else "`Reviewer Not Found`"
+    return True
+
+async def review_request_removed_context(event: PullRequestEvent, ctx: dict, user_mentions: dict) -> bool:
+    ctx["removed_reviewer"] = user_mentions[event.requested_reviewer]
+    return True
+
+async def unknown_action_context(event: PullRequestEvent, ctx: dict, user_mentions: dict) -> bool:
+    ctx["devops"] = f"<@{await get_slack_id_by_email(AUTHOR_EMAIL)}>"
+    return True
+
+CONTEXT_BUILDERS = {
+    "closed": closed_context,
+    "edited": edited_context,
+    "synchronize": synchronize_context,
+    "labeled": labels_context,
+    "unlabeled": labels_context,
+    "assigned": assignees_context,
+    "unassigned": assignees_context,
+    "milestoned": milestone_context,
+    "demilestoned": milestone_context,
+    "review_requested": review_requested_context,
+    "review_request_removed": review_request_removed_context,
+}
+
+async def send_digest(message: dict):
+    await send_slack_message(message, PRIORITY_NORMAL)
+
+async def add_to_digest(event: PullRequestEvent):
+    """Buffer the event for the repo's digest instead of posting it; no mentions are resolved."""
+    record = {"pr": event.number, "title": event.title, "url": event.url, "author": event.author,
+              "action": event.action, "merged": bool(event.merged)}
+    if event.action == "review_requested":
+        record["reviewers"] = event.requested_reviewers
+    if event.action in MERGEABLE_ACTIONS:
+        merge_status = await stage_seconds.timed(fetch_mergeable_state(event.repo, event.number), stage="mergeable")
+        if merge_status == MERGE_STATUS_CHECKING:
+            async def record_merge_status(resolved_status: str):
+                await app.state.digest.add(event.repo, {"pr": event.number, "action": "mergeable",
+                                                        "conflicted": resolved_status == MERGE_STATUS_CONFLICTS})
+
+            watch_mergeable_state(event.repo, event.number, event.head_sha, record_merge_status)
         else:
-            milestone_title = "No milestone"
-            milestone_due_date = "No due date set"
-        
-        # Determine the action type and corresponding message
-        if payload['action'] == "milestoned":
-            action_message = "📌 PR Milestoned"
-            additional_message = f"assigned to milestone `{milestone_title}`"
-            # Include milestone info in the message
-            Message_in_Body = (
-                f"{action_message}\n"
-                f"Milestone: `{milestone_title}`\n"
-                f"Due Date: `{milestone_due_date}`\n"
-            )
-        else:  # For "demilestoned"
-            action_message = "🚫 Milestone Removed"
-            additional_message = f"removed from the milestone"
-            # Only include the title of the removed milestone
-            Message_in_Body = (
-                f"{action_message}\n"
-                f"Removed Milestone: `{milestone_title}`\n"
-            )
-
-        # Append action details
-        Message_in_Body += (
-            f"Actioned by: {PR_ACTOR_SLACK}\n"
-            f"`[TL]` {team_lead_mentions} {additional_message}. Kindly check the <{pr_url}|PR> here.\n"
-        )
-        
-        # Prepare the message
-        message = {
-            "channel": channel,
-            "text": action_message,
-            "blocks": [
-                {
-                    "type": "section",
-                    "text": { "type": "mrkdwn", "text": Message_in_Body }
-                }
-            ]
-        }
-        
-        # Send the Slack message
-        await send_slack_message(message)
-    
-    elif payload['action'] == "dequeued":
-        Message_in_Body = f"This PR was dequeued from a merge queue by {PR_ACTOR_SLACK}.\n `[TL]` {team_lead_mentions}, Kindly have a look at this <{pr_url}|PR>."
-        message = {
-            "channel": channel,
-            "text": "⏳ PR Dequeued",
-            "blocks": [
-                { "type": "section", "text": { "type": "mrkdwn", "text": Message_in_Body } }
-            ]
-        }
-        await send_slack_message(message)
-        
-    elif payload['action'] == "enqueued":
-        Message_in_Body = (
-                            f"📥 PR Enqueued\n"
-                            f"This PR was added to a merge queue By {PR_ACTOR_SLACK}.\n `[TL]` {team_lead_mentions} Kindly check this <{pr_url}|PR>."
-                        )
-        message = {
-            "channel": channel,
-            "text": "📥 PR Enqueued",
-            "blocks": [
-                { "type": "section", "text": { "type": "mrkdwn", "text": Message_in_Body } }
-            ]
-        }
-        await send_slack_message(message)
-        
-    elif payload['action'] == "ready_for_review":
-        Message_in_Body = (
-                            f"✅ PR Ready for Review\n"
-                            f"`[TL]` {team_lead_mentions} This draft <{pr_url}|PR> is now *ready for review*.\n"
-                        )
-        message = {
-            "channel": channel,
-            "text": "✅ PR Ready for Review",
-            "blocks": [
-                { "type": "section", "text": { "type": "mrkdwn", "text": Message_in_Body } }
-            ]
-        }
-        await send_slack_message(message)
-        
-    elif payload['action'] == "review_requested":
-        reviewers = payload["pull_request"].get("requested_reviewers", [])
+            record["conflicted"] = merge_status == MERGE_STATUS_CONFLICTS
+    await app.state.digest.add(event.repo, record)
+
+async def post_pr_message(event: PullRequestEvent):
+    action = event.action
+    repo_name = event.repo
+    pr_number = event.number
+    pr_head = event.head_ref
+    pr_base = event.base_ref
+    commit_sha = event.head_sha
     
-        # 🔁 Resolve GitHub usernames to Slack mentions using your helper
-        requested_mentions = []
-        for reviewer in reviewers:
-            github_username = reviewer["login"]
-            mention = await resolve_slack_mention(github_username)
-            requested_mentions.append(mention)
-
-        requested_mentions_str = ", ".join(requested_mentions) if requested_mentions else "`Reviewer Not Found`"
-
-        print(requested_mentions)
-        Message_in_Body = (
-                            f"🧐 Review Requested\n"
-                            f"`[TL]` {team_lead_mentions} Review has been requested for this <{pr_url}|PR> from {requested_mentions_str} by {PR_ACTOR_SLACK}.\n"
-                        )
-        message = {
-            "channel": channel,
-            "text": "🧐 Review Requested",
-            "blocks": [
-                { "type": "section", "text": { "type": "mrkdwn", "text": Message_in_Body } }
-            ]
-        }
-        await send_slack_message(message)
-        
-    elif payload['action'] == "review_request_removed":
-        reviewers = payload.get("requested_reviewer", [])
-        removed_mentions = await resolve_slack_mention(reviewers['login'])
-        Message_in_Body = (
-                            f"🚫 Review Request Removed\n"
-                            f"`[TL]` {team_lead_mentions} Review request was removed for <{pr_url}|PR>. Member Removed:  {removed_mentions} by {PR_ACTOR_SLACK}.\n"
-                        )
-        message = {
-            "channel": channel,
-            "text": "🚫 Review Request Removed",
-            "blocks": [
-                { "type": "section", "text": { "type": "mrkdwn", "text": Message_in_Body } }
-            ]
-        }
-        await send_slack_message(message)
-                
+    PR_AUTHOR = event.author  # the one who originally opened the PR action username
+    PR_ACTOR = event.actor  # the one who performed the
+    coalesced = event.coalesced or {}
+
+    # Every GitHub user this event can mention
+    usernames = {PR_AUTHOR, PR_ACTOR}
+    if action == "review_requested":
+        usernames.update(event.requested_reviewers)
+    elif action == "review_request_removed":
+        usernames.add(event.requested_reviewer)
+    elif action in ["assigned", "unassigned"]:
+        usernames.update(coalesced.get("assignees") or [event.assignee])
+    usernames = [username for username in usernames if username]
+
+    # Team leads (if any)
+    team_leads = get_repo_settings(repo_name).get("leads", [])
+
+    async def no_merge_status():
+        return ""
+
+    # 🧠 Resolve team leads, users and 🔍 the mergeable status from GitHub concurrently
+    lookups, merge_status = await asyncio.gather(
+        stage_seconds.timed(gather_bounded(
+            [get_slack_id_by_email(email) for email in team_leads]
+            + [resolve_slack_mention(username) for username in usernames],
+            MENTION_FANOUT,
+        ), stage="mentions"),
+        stage_seconds.timed(fetch_mergeable_state(repo_name, pr_number), stage="mergeable")
+        if action in MERGEABLE_ACTIONS else no_merge_status(),
+    )
+    lead_ids, user_mentions = lookups[:len(team_leads)], dict(zip(usernames, lookups[len(team_leads):]))
+
+    team_lead_mentions = [f"<@{slack_id}>" for slack_id in lead_ids if slack_id]
+
+    ctx = {
+        "channel": os.getenv("SLACK_CHANNEL"),
+        "action": action,
+        "repo": repo_name,
+        "pr_number": pr_number,
+        "pr_url": event.url,
+        "pr_title": event.title,
+        "pr_head": pr_head,
+        "pr_base": pr_base,
+        "short_commit": commit_sha[:7],
+        "workflow_url": f"https://github.com/{repo_name}/pull/{pr_number}",
+        "author": user_mentions[PR_AUTHOR],
+        "actor": user_mentions[PR_ACTOR],
+        "team_leads": ' '.join(team_lead_mentions) if team_lead_mentions else 'N/A',
+        "merge_status": merge_status,
+    }
+    build_context = CONTEXT_BUILDERS.get(action) if templates.has(action) else unknown_action_context
+    if build_context and not await build_context(event, ctx, user_mentions):
+        return
+
+    template = templates.get(action)
+    message = template.render(ctx)
+    # The response (channel + ts) is only needed to edit the placeholder mergeable state later
+    response = await send_slack_message(message, template.priority, wait=merge_status == MERGE_STATUS_CHECKING) # Sample ID = HI1-T406
+
+    if merge_status == MERGE_STATUS_CHECKING and response.get("ok"):
+        # Posted with a placeholder; edit the message in place once GitHub has an answer
+        async def update_merge_status(resolved_status: str):
+            await update_slack_message(response["channel"], response["ts"], template.render({**ctx, "merge_status": resolved_status}))
+
+        watch_mergeable_state(repo_name, pr_number, commit_sha, update_merge_status)
+
+async def handle_pr_event(event: PullRequestEvent):
+    # Digest-mode repos get one summary per interval instead of a message per event
+    if get_repo_settings(event.repo).get("digest_interval"):
+        await add_to_digest(event)
     else:
-        slack_id = await get_slack_id_by_email({AUTHOR_EMAIL})
-        author_slack_mention = f"<@{slack_id}>"
-        message = {
-            "channel": channel,
-            "text": "👀 New Pull Request Notification",
-            "blocks": [
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": (
-                            f":eyes: PR Unknown Event Found.\n"
-                            f"Current Status: `Event: {payload['action']} Devops Check it`\n"
-                        )
-                    }
-                },
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": f"{author_slack_mention} Kindly add event for this action {payload['action']}."
-                    }
-                }
-            ]
-        }
+        await post_pr_message(event)
+
+    action = event.action
+    repo_name = event.repo
+    pr_head = event.head_ref
+    pr_base = event.base_ref
+    if action == "opened":
+        print(await stage_seconds.timed(update_status_with_task_key(pr_head, "Ready For Review", f''), stage="zoho_update")) #New <a href="{pr_url}">PR</a> opened. Please review it.
+    elif action == "closed" and event.merged:
+        print(await stage_seconds.timed(update_status_with_task_key(pr_head, "PR Merge", f''), stage="zoho_update"))
+        record_merged_pr(repo_name, pr_base, pr_head, event.merged_at)
+        DATA = await stage_seconds.timed(Read_For_QA(pr_head, repo_name, 7), stage="zoho_ready_for_qa")
         
-        await send_slack_message(message)
-    
+        if DATA != None:
+            message_lines = [f"{await get_qa_mentions()}\n*Kindly check these task(s) Ready For QA:*"]
+            for i, (key, task) in enumerate(DATA.items(), 1):
+                task_link = task.get("link", "#")
+                message_lines.append(f"{i}) <{task_link}|{key}>")
+            
+            final_message = "\n".join(message_lines)
+            message = {
+                        "channel": QA_Channel,
+                        "text": final_message,
+                      }
+            await send_slack_message(message, PRIORITY_HIGH)
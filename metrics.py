@@ -0,0 +1,107 @@
+import time
+import bisect
+from contextlib import contextmanager
+
+# Seconds; spans in-memory work (parse) up to slow Zoho scans
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_registry: list = []
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        _registry.append(self)
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.labelnames, key)} {value}" for key, value in self._values.items()]
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series: dict[tuple, list] = {}  # labels -> [bucket counts..., sum, count]
+        _registry.append(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1  # buckets are cumulated when rendered
+        series[-2] += value
+        series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    async def timed(self, coro, **labels):
+        """Await ``coro`` and record how long it took."""
+        with self.time(**labels):
+            return await coro
+
+    def collect(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        for key, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(names, key + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {series[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+class GaugeCallback:
+    """Gauge read at scrape time; ``fn`` returns a number or ``{label values tuple: number}``."""
+    def __init__(self, name: str, help: str, fn, labelnames: tuple = (), kind: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.labelnames = labelnames
+        self.kind = kind
+        _registry.append(self)
+
+    def collect(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            values = self.fn()
+        except Exception:
+            return lines  # source not ready yet (e.g. before startup)
+        if not isinstance(values, dict):
+            values = {(): values}
+        lines += [f"{self.name}{_labels(self.labelnames, key)} {value}" for key, value in values.items() if value is not None]
+        return lines
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    return "\n".join(line for metric in _registry for line in metric.collect()) + "\n"
+
+webhook_deliveries = Counter("webhook_deliveries_total", "Webhook deliveries by outcome at the endpoint.", ("result",))
+webhook_events = Counter("webhook_events_total", "Webhook events handled, by event type and action.", ("event", "action"))
+stage_seconds = Histogram("stage_duration_seconds", "Time spent per processing stage.", ("stage",))
+outbound_requests = Counter("outbound_requests_total", "Outbound HTTP requests by upstream and status code.", ("upstream", "status"))
+outbound_seconds = Histogram("outbound_request_duration_seconds", "Outbound HTTP latency (until response headers).", ("upstream", "status"))
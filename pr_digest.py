@@ -0,0 +1,134 @@
+import os
+import time
+import asyncio
+from events import loads, dumps
+from shared_state import shared_state
+
+DIGEST_TICK = float(os.getenv("DIGEST_TICK", "30"))  # how often due digests are checked, seconds
+DIGEST_SECTION_MAX_ITEMS = 15  # PR lines per section; keeps each section under Slack's 3000-char limit
+
+# (record flag, heading) in the order the sections are posted
+DIGEST_SECTIONS = (
+    ("opened", "🆕 Opened"),
+    ("merged", "🔀 Merged"),
+    ("conflicted", "⚠️ Has conflicts"),
+    ("review_requested", "👀 Review requested"),
+)
+
+def _summarise(records: list) -> dict:
+    """Fold buffered records into one entry per PR; later records win."""
+    prs = {}
+    for record in records:
+        pr = prs.setdefault(record["pr"], {"pr": record["pr"], "events": 0, "reviewers": []})
+        pr["events"] += 1
+        for field in ("title", "url", "author"):
+            if record.get(field):
+                pr[field] = record[field]
+        action = record["action"]
+        if action in ("opened", "reopened", "ready_for_review"):
+            pr["opened"] = True
+        elif action == "closed":
+            pr["merged"] = record.get("merged", False)
+            pr["closed"] = True
+        elif action == "review_requested":
+            pr["review_requested"] = True
+            pr["reviewers"] += [reviewer for reviewer in record.get("reviewers", []) if reviewer not in pr["reviewers"]]
+        if "conflicted" in record:
+            pr["conflicted"] = record["conflicted"]  # the newest mergeable state counts
+    for pr in prs.values():
+        if pr.get("closed"):
+            pr["conflicted"] = pr["review_requested"] = False  # nothing left to do on a closed PR
+    return prs
+
+def _pr_line(pr: dict) -> str:
+    line = f"• <{pr.get('url', '#')}|#{pr['pr']}> {pr.get('title', '')}"
+    if pr.get("author"):
+        line += f" – `{pr['author']}`"
+    if pr["reviewers"]:
+        line += " → " + ", ".join(f"`{reviewer}`" for reviewer in pr["reviewers"])
+    return line
+
+def render_digest(repo: str, channel: str, records: list) -> dict:
+    prs = _summarise(records)
+    events = sum(1 for record in records if record["action"] != "mergeable")  # not follow-up merge states
+    blocks = [{
+        "type": "section",
+        "text": {"type": "mrkdwn", "text": f"*📰 PR digest for `{repo}`* – {events} event(s) on {len(prs)} PR(s)"},
+    }]
+    for flag, heading in DIGEST_SECTIONS:
+        matching = [pr for pr in prs.values() if pr.get(flag)]
+        if not matching:
+            continue
+        lines = [_pr_line(pr) for pr in matching[:DIGEST_SECTION_MAX_ITEMS]]
+        if len(matching) > DIGEST_SECTION_MAX_ITEMS:
+            lines.append(f"…and {len(matching) - DIGEST_SECTION_MAX_ITEMS} more")
+        blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": f"*{heading}* ({len(matching)})\n" + "\n".join(lines)}})
+    quiet = sum(1 for pr in prs.values() if not any(pr.get(flag) for flag, _ in DIGEST_SECTIONS))
+    if quiet:
+        blocks.append({"type": "context", "elements": [{"type": "mrkdwn", "text": f"{quiet} other PR(s) had minor updates."}]})
+    return {"channel": channel, "text": f"PR digest for {repo}", "blocks": blocks}
+
+class DigestScheduler:
+    """Buffers PR events of digest-mode repos and posts one summary per repo per interval.
+
+    Events are kept as small JSON records in the shared state queue
+    ``digest:<repo>``. Each interval slot is claimed in the shared state too,
+    so with several workers a repo still gets exactly one digest.
+    """
+    def __init__(self, repos, send, state=shared_state, tick: float = DIGEST_TICK):
+        self.repos = repos  # () -> {repo: (interval seconds, channel)}
+        self.send = send    # async (message) -> None
+        self.state = state
+        self.tick = tick
+        self._slots: dict[str, int] = {}
+        self._task = None
+        self.posted = 0
+
+    async def add(self, repo: str, record: dict):
+        await self.state.push(f"digest:{repo}", dumps(record))
+
+    async def flush(self, repo: str, channel: str) -> int:
+        records = []
+        while (item := await self.state.pop(f"digest:{repo}")) is not None:
+            records.append(loads(item))
+        if records:
+            await self.send(render_digest(repo, channel, records))
+            self.posted += 1
+            print(f"📰 Posted digest for {repo}: {len(records)} event(s).")
+        return len(records)
+
+    async def flush_due(self, now: float | None = None):
+        now = time.time() if now is None else now
+        for repo, (interval, channel) in self.repos().items():
+            slot = int(now // interval)
+            previous = self._slots.setdefault(repo, slot)
+            if slot == previous:
+                continue
+            self._slots[repo] = slot
+            if await self.state.add(f"digest:slot:{repo}:{slot}", os.getpid(), ttl=interval * 2):
+                await self.flush(repo, channel)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            try:
+                await self.flush_due()
+            except Exception as e:
+                print("[ERROR] PR digest failed: ", e)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if not self.state.is_shared:
+            # Process-local buffers would be lost; post what we have. Shared buffers wait for the next owner.
+            for repo, (_, channel) in self.repos().items():
+                await self.flush(repo, channel)
+
+    def stats(self) -> dict:
+        return {"repos": len(self.repos()), "posted": self.posted}
@@ -0,0 +1,246 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+from collections import deque
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # optional: only needed for SHARED_STATE_BACKEND=redis
+    aioredis = None
+
+SHARED_STATE_BACKEND = os.getenv("SHARED_STATE_BACKEND", "memory")  # memory | sqlite | redis
+SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH", "shared_state.db")
+SHARED_STATE_URL = os.getenv("SHARED_STATE_URL", "redis://localhost:6379/0")
+SHARED_STATE_PREFIX = os.getenv("SHARED_STATE_PREFIX", "prwatcher:")
+
+class MemoryState:
+    """Process-local state: the default for a single worker.
+
+    ``is_shared`` is False, so callers keep their existing in-process paths
+    and never pay for a round trip.
+    """
+    is_shared = False
+
+    def __init__(self):
+        self._values: dict[str, tuple] = {}  # key -> (value, expires_at | None)
+        self._queues: dict[str, deque] = {}
+
+    def _live(self, key: str):
+        entry = self._values.get(key)
+        if entry is not None and entry[1] is not None and entry[1] < time.time():
+            del self._values[key]
+            return None
+        return entry
+
+    async def get(self, key: str):
+        entry = self._live(key)
+        return entry[0] if entry else None
+
+    async def set(self, key: str, value, ttl: float | None = None):
+        self._values[key] = (value, time.time() + ttl if ttl else None)
+
+    async def add(self, key: str, value, ttl: float | None = None) -> bool:
+        if self._live(key):
+            return False
+        await self.set(key, value, ttl)
+        return True
+
+    async def renew(self, key: str, value, ttl: float) -> bool:
+        entry = self._live(key)
+        if not entry or entry[0] != value:
+            return False
+        await self.set(key, value, ttl)
+        return True
+
+    async def delete(self, key: str, value=None):
+        entry = self._live(key)
+        if entry and (value is None or entry[0] == value):
+            del self._values[key]
+
+    async def count(self, prefix: str) -> int:
+        return sum(1 for key in list(self._values) if key.startswith(prefix) and self._live(key))
+
+    async def push(self, queue: str, item: bytes):
+        self._queues.setdefault(queue, deque()).append(item)
+
+    async def push_front(self, queue: str, item: bytes):
+        self._queues.setdefault(queue, deque()).appendleft(item)
+
+    async def pop(self, queue: str) -> bytes | None:
+        items = self._queues.get(queue)
+        return items.popleft() if items else None
+
+    async def length(self, queue: str) -> int:
+        return len(self._queues.get(queue) or ())
+
+    async def close(self):
+        pass
+
+class SqliteState:
+    """State shared by every worker on one host through a WAL-mode SQLite file.
+
+    Also the local stand-in for the Redis backend when testing multi-worker
+    setups without a server.
+    """
+    is_shared = True
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS kv_expires ON kv (expires_at)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS queue (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, item BLOB)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS queue_name ON queue (name, id)")
+
+    def _execute(self, sql: str, params: tuple = ()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _transaction(self, statements: list) -> int:
+        """Run statements atomically across processes; returns the last statement's rowcount."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in statements:
+                    rowcount = self._conn.execute(sql, params).rowcount
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return rowcount
+
+    async def get(self, key: str):
+        rows = await asyncio.to_thread(
+            self._execute, "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at >= ?)", (key, time.time())
+        )
+        return json.loads(rows[0][0]) if rows else None
+
+    async def set(self, key: str, value, ttl: float | None = None):
+        await asyncio.to_thread(
+            self._execute, "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), time.time() + ttl if ttl else None),
+        )
+
+    async def add(self, key: str, value, ttl: float | None = None) -> bool:
+        now = time.time()
+        inserted = await asyncio.to_thread(self._transaction, [
+            # Claims are add()ed once and left to expire, so expired rows are swept here
+            ("DELETE FROM kv WHERE expires_at < ?", (now,)),
+            ("INSERT OR IGNORE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+             (key, json.dumps(value), now + ttl if ttl else None)),
+        ])
+        return inserted == 1
+
+    async def renew(self, key: str, value, ttl: float) -> bool:
+        now = time.time()
+        updated = await asyncio.to_thread(
+            self._transaction,
+            [("UPDATE kv SET expires_at = ? WHERE key = ? AND value = ? AND expires_at >= ?",
+              (now + ttl, key, json.dumps(value), now))],
+        )
+        return updated == 1
+
+    async def delete(self, key: str, value=None):
+        if value is None:
+            await asyncio.to_thread(self._execute, "DELETE FROM kv WHERE key = ?", (key,))
+        else:
+            await asyncio.to_thread(self._execute, "DELETE FROM kv WHERE key = ? AND value = ?", (key, json.dumps(value)))
+
+    async def count(self, prefix: str) -> int:
+        rows = await asyncio.to_thread(
+            self._execute, "SELECT COUNT(*) FROM kv WHERE substr(key, 1, ?) = ? AND (expires_at IS NULL OR expires_at >= ?)",
+            (len(prefix), prefix, time.time()),
+        )
+        return rows[0][0]
+
+    async def push(self, queue: str, item: bytes):
+        await asyncio.to_thread(self._execute, "INSERT INTO queue (name, item) VALUES (?, ?)", (queue, item))
+
+    async def push_front(self, queue: str, item: bytes):
+        # Ids order the queues, so going back to the front means taking an id below every other
+        await asyncio.to_thread(
+            self._execute, "INSERT INTO queue (id, name, item) VALUES ((SELECT COALESCE(MIN(id), 1) - 1 FROM queue), ?, ?)",
+            (queue, item),
+        )
+
+    async def pop(self, queue: str) -> bytes | None:
+        rows = await asyncio.to_thread(
+            self._execute,
+            "DELETE FROM queue WHERE id = (SELECT id FROM queue WHERE name = ? ORDER BY id LIMIT 1) RETURNING item",
+            (queue,),
+        )
+        return rows[0][0] if rows else None
+
+    async def length(self, queue: str) -> int:
+        rows = await asyncio.to_thread(self._execute, "SELECT COUNT(*) FROM queue WHERE name = ?", (queue,))
+        return rows[0][0]
+
+    async def close(self):
+        with self._lock:
+            self._conn.close()
+
+# Compare-and-act scripts so a lease is only extended / released by its holder
+_RENEW_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end"
+_DELETE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+
+class RedisState:
+    """State shared across hosts through any Redis-compatible server (Redis, Valkey, KeyDB…)."""
+    is_shared = True
+
+    def __init__(self, url: str, prefix: str = SHARED_STATE_PREFIX):
+        if aioredis is None:
+            raise RuntimeError("SHARED_STATE_BACKEND=redis needs the 'redis' package (pip install redis)")
+        self._redis = aioredis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key: str):
+        value = await self._redis.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    async def set(self, key: str, value, ttl: float | None = None):
+        await self._redis.set(self.prefix + key, json.dumps(value), px=int(ttl * 1000) if ttl else None)
+
+    async def add(self, key: str, value, ttl: float | None = None) -> bool:
+        return bool(await self._redis.set(self.prefix + key, json.dumps(value), px=int(ttl * 1000) if ttl else None, nx=True))
+
+    async def renew(self, key: str, value, ttl: float) -> bool:
+        return bool(await self._redis.eval(_RENEW_SCRIPT, 1, self.prefix + key, json.dumps(value), int(ttl * 1000)))
+
+    async def delete(self, key: str, value=None):
+        if value is None:
+            await self._redis.delete(self.prefix + key)
+        else:
+            await self._redis.eval(_DELETE_SCRIPT, 1, self.prefix + key, json.dumps(value))
+
+    async def count(self, prefix: str) -> int:
+        return len([key async for key in self._redis.scan_iter(match=self.prefix + prefix + "*")])
+
+    async def push(self, queue: str, item: bytes):
+        await self._redis.rpush(self.prefix + queue, item)
+
+    async def push_front(self, queue: str, item: bytes):
+        await self._redis.lpush(self.prefix + queue, item)
+
+    async def pop(self, queue: str) -> bytes | None:
+        return await self._redis.lpop(self.prefix + queue)
+
+    async def length(self, queue: str) -> int:
+        return await self._redis.llen(self.prefix + queue)
+
+    async def close(self):
+        await self._redis.aclose()
+
+def create_shared_state():
+    if SHARED_STATE_BACKEND == "sqlite":
+        return SqliteState(SHARED_STATE_PATH)
+    if SHARED_STATE_BACKEND == "redis":
+        return RedisState(SHARED_STATE_URL)
+    return MemoryState()
+
+shared_state = create_shared_state()
@@ -0,0 +1,253 @@
+import os
+import json
+from string import Formatter
+from utils import PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+
+SLACK_TEMPLATES_PATH = os.getenv("SLACK_TEMPLATES_PATH", "")  # optional JSON file adding / overriding actions
+
+PRIORITIES = {"high": PRIORITY_HIGH, "normal": PRIORITY_NORMAL, "low": PRIORITY_LOW}
+
+# Template format
+# ---------------
+# Every string is a ``str.format`` template filled from the event context.
+# {"$switch": "<var>", "cases": {...}, "default": ...} picks a value by a context variable.
+# A block or field carrying "$if": "<var>" is dropped when that variable is empty.
+# "vars" are per-template defaults; the context overrides them.
+
+def _section(text) -> dict:
+    return {"type": "section", "text": {"type": "mrkdwn", "text": text}}
+
+def _simple(text: str, body: str, priority: str = "normal") -> dict:
+    return {"priority": priority, "text": text, "blocks": [_section(body)]}
+
+def _pr_status(emoji: str, header: str, status: str | None, body, by: str = "author", priority: str = "normal") -> dict:
+    blocks = [
+        _section(
+            f"{emoji} {header} by {{{by}}}:\n"
+            ":twisted_rightwards_arrows: *Branch:* `{pr_head}` → `{pr_base}`\n"
+            "Current Status: {status}"
+        ),
+        {"type": "section", "fields": [
+            {"type": "mrkdwn", "text": "*Commit:* <{workflow_url}|`{short_commit}`>"},
+            {"type": "mrkdwn", "text": "*Mergeable:* {merge_status}", "$if": "merge_status"},
+        ]},
+    ]
+    if body:
+        blocks.append(_section(body))
+    return {
+        "priority": priority,
+        "vars": {"status": status or ""},  # closed / edited fill it in per event
+        "text": f"{emoji} Pull Request Notification",
+        "blocks": blocks,
+    }
+
+def _by_merge_status(mergeable: str, conflicts: str, default: str) -> dict:
+    return {"$switch": "merge_status", "cases": {"✅": mergeable, "❌ `Has conflicts`": conflicts}, "default": default}
+
+REVIEW_BODY = _by_merge_status(
+    "`[TL]` {team_leads} Kindly review this <{pr_url}| PR>",
+    "`[TL]` {team_leads} Please ask `[Developer]` {actor} to resolve this <{pr_url}| PR>.",
+    "`[TL]` {team_leads} Please review this <{pr_url}| PR>.",
+)
+
+DEFAULT_TEMPLATES = {
+    "opened": _pr_status(":rotating_light:", "*New PR* opened", "`Recently Created`", REVIEW_BODY),
+    "reopened": _pr_status(":arrows_counterclockwise:", "PR was *reopened*", "`Reopened`", REVIEW_BODY),
+    "synchronize": _pr_status(
+        ":rotating_light:", "*New PR* updated", "`Opened PR file edited / changed during active PR`",
+        _by_merge_status(
+            "`[TL]` {team_leads} Kindly review this <{pr_url}| PR> recently edited by the {actor}.",
+            REVIEW_BODY["cases"]["❌ `Has conflicts`"],
+            REVIEW_BODY["default"],
+        ),
+    ),
+    "edited": _pr_status(
+        ":pencil2:", "PR was *edited*", None,
+        _by_merge_status(
+            "`[TL]` {team_leads}, Please review this <{pr_url}|PR> now after edits by {actor}.",
+            "`[TL]` {team_leads}, Please ask `[Developer]` {actor} / {author} to resolve this <{pr_url}| PR>.",
+            "`[TL]` {team_leads}, PR has been edited by {actor}. Please review <{pr_url}|PR>.",
+        ),
+    ),
+    "converted_to_draft": _pr_status(
+        ":memo:", "PR was *converted to draft*", "`Draft Mode Enabled`",
+        "`[TL]` {team_leads}, This <{pr_url}|PR> has been converted to *Draft* mode.\n",
+    ),
+    "closed": _pr_status(":lock:", "PR is *closed*", None, None, by="actor", priority="high"),
+    "locked": _simple(
+        ":lock: PR Locked",
+        ":lock: PR Locked\n"
+        "`[TL]` {team_leads} This <{pr_url}|PR> by opened by {author} has been `locked` by {actor}.",
+        priority="low",
+    ),
+    "unlocked": _simple(
+        ":unlock: PR Unlocked",
+        ":unlock: PR Unlocked\n"
+        "`[TL]` {team_leads} This <{pr_url}|PR> by opened by {author} has been `unlocked` by {actor}.",
+        priority="low",
+    ),
+    "labeled": _simple(
+        "🏷️ Labels Updated on PR",
+        "🏷️ Labels Updated on PR.\n"
+        "`[TL]` {team_leads} Labels {label_summary} on this <{pr_url}|PR> by {actor}.\n",
+        priority="low",
+    ),
+    "auto_merge_enabled": _simple(
+        "✅ Auto-Merge Enabled",
+        ":white_check_mark: Auto-merge was *enabled* by {actor} on this PR.\n"
+        ":twisted_rightwards_arrows: *Branch:* `{pr_head}` → `{pr_base}`\n"
+        "`[TL]` {team_leads} Please have a look at this <{pr_url}|PR>.",
+        priority="low",
+    ),
+    "auto_merge_disabled": _simple(
+        "🚫 Auto-Merge Disabled",
+        ":no_entry_sign: Auto-merge was *disabled* by {actor} on this PR.\n"
+        ":twisted_rightwards_arrows: *Branch:* `{pr_head}` → `{pr_base}`\n"
+        "`[TL]` {team_leads} Please have a look at this <{pr_url}|PR>.",
+        priority="low",
+    ),
+    "assigned": _simple(
+        ":heavy_plus_sign: Pull Request Assigned",
+        ":heavy_plus_sign: {actor} *assigned* {assignees} to this PR.\n"
+        ":twisted_rightwards_arrows: *Branch:* `{pr_head}` → `{pr_base}`\n"
+        "{team_leads} please be informed about this <{pr_url}|PR>.\n",
+        priority="low",
+    ),
+    "unassigned": _simple(
+        ":heavy_division_sign: Pull Request Unassigned",
+        ":heavy_division_sign: {actor} *unassigned* {assignees} from this PR.\n"
+        ":twisted_rightwards_arrows: *Branch:* `{pr_head}` → `{pr_base}`\n"
+        "{team_leads} please be informed about this <{pr_url}|PR>.\n",
+        priority="low",
+    ),
+    "milestoned": _simple(
+        "📌 PR Milestoned",
+        "📌 PR Milestoned\n"
+        "Milestone: `{milestone_title}`\n"
+        "Due Date: `{milestone_due}`\n"
+        "Actioned by: {actor}\n"
+        "`[TL]` {team_leads} assigned to milestone `{milestone_title}`. Kindly check the <{pr_url}|PR> here.\n",
+        priority="low",
+    ),
+    "demilestoned": _simple(
+        "🚫 Milestone Removed",
+        "🚫 Milestone Removed\n"
+        "Removed Milestone: `{milestone_title}`\n"
+        "Actioned by: {actor}\n"
+        "`[TL]` {team_leads} removed from the milestone. Kindly check the <{pr_url}|PR> here.\n",
+        priority="low",
+    ),
+    "dequeued": _simple(
+        "⏳ PR Dequeued",
+        "This PR was dequeued from a merge queue by {actor}.\n `[TL]` {team_leads}, Kindly have a look at this <{pr_url}|PR>.",
+    ),
+    "enqueued": _simple(
+        "📥 PR Enqueued",
+        "📥 PR Enqueued\n"
+        "This PR was added to a merge queue By {actor}.\n `[TL]` {team_leads} Kindly check this <{pr_url}|PR>.",
+    ),
+    "ready_for_review": _simple(
+        "✅ PR Ready for Review",
+        "✅ PR Ready for Review\n"
+        "`[TL]` {team_leads} This draft <{pr_url}|PR> is now *ready for review*.\n",
+    ),
+    "review_requested": _simple(
+        "🧐 Review Requested",
+        "🧐 Review Requested\n"
+        "`[TL]` {team_leads} Review has been requested for this <{pr_url}|PR> from {reviewers} by {actor}.\n",
+    ),
+    "review_request_removed": _simple(
+        "🚫 Review Request Removed",
+        "🚫 Review Request Removed\n"
+        "`[TL]` {team_leads} Review request was removed for <{pr_url}|PR>. Member Removed:  {removed_reviewer} by {actor}.\n",
+        priority="low",
+    ),
+    # Fallback for actions without a template
+    "_unknown": {
+        "priority": "low",
+        "text": "👀 New Pull Request Notification",
+        "blocks": [
+            _section(":eyes: PR Unknown Event Found.\nCurrent Status: `Event: {action} Devops Check it`\n"),
+            _section("{devops} Kindly add event for this action {action}."),
+        ],
+    },
+}
+DEFAULT_TEMPLATES["unlabeled"] = DEFAULT_TEMPLATES["labeled"]
+
+_SKIP = object()
+
+def _compile(node):
+    """Turn a template node into ``render(ctx)``; constant parts are resolved once, here."""
+    if isinstance(node, str):
+        pieces = list(Formatter().parse(node))
+        if all(field is None for _, field, _, _ in pieces):
+            return lambda ctx: node
+        if any(spec or conversion or not field.isidentifier()
+               for _, field, spec, conversion in pieces if field is not None):
+            return lambda ctx: node.format_map(ctx)  # rare: format specs, indexing
+        parts = tuple((literal, field) for literal, field, _, _ in pieces)
+        return lambda ctx: "".join(literal + (str(ctx[field]) if field is not None else "") for literal, field in parts)
+
+    if isinstance(node, list):
+        items = [_compile(item) for item in node]
+        def render_list(ctx):
+            rendered = [item(ctx) for item in items]
+            return [value for value in rendered if value is not _SKIP]
+        return render_list
+
+    if isinstance(node, dict):
+        if "$switch" in node:
+            var = node["$switch"]
+            cases = {key: _compile(value) for key, value in node["cases"].items()}
+            default = _compile(node.get("default", ""))
+            return lambda ctx: cases.get(str(ctx.get(var, "")), default)(ctx)
+
+        condition = node.get("$if")
+        fields = [(key, _compile(value)) for key, value in node.items() if key != "$if"]
+        def render_dict(ctx):
+            if condition and not str(ctx.get(condition, "")).strip():
+                return _SKIP
+            return {key: value(ctx) for key, value in fields}
+        return render_dict
+
+    return lambda ctx: node
+
+class MessageTemplate:
+    __slots__ = ("priority", "vars", "_render")
+
+    def __init__(self, spec: dict):
+        self.priority = PRIORITIES[spec.get("priority", "normal")]
+        self.vars = spec.get("vars", {})
+        self._render = _compile({
+            "channel": spec.get("channel", "{channel}"),
+            "text": spec["text"],
+            "blocks": spec["blocks"],
+        })
+
+    def render(self, ctx: dict) -> dict:
+        return self._render({**self.vars, **ctx} if self.vars else ctx)
+
+class TemplateRegistry:
+    """Slack messages per PR action, compiled once and looked up by action name."""
+    def __init__(self, specs: dict = DEFAULT_TEMPLATES, path: str = SLACK_TEMPLATES_PATH):
+        self._templates = {action: MessageTemplate(spec) for action, spec in specs.items()}
+        if path:
+            self.load(path)
+
+    def load(self, path: str):
+        """Add or replace templates from a JSON file of ``{action: spec}``."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                specs = json.load(f)
+            self._templates.update({action: MessageTemplate(spec) for action, spec in specs.items()})
+            print(f"🧩 Loaded {len(specs)} Slack template(s) from {path}.")
+        except Exception as e:
+            print(f"[ERROR] Could not load Slack templates from {path}: ", e)
+
+    def has(self, action: str) -> bool:
+        return action in self._templates
+
+    def get(self, action: str) -> MessageTemplate:
+        return self._templates.get(action) or self._templates["_unknown"]
+
+templates = TemplateRegistry()
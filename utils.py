@@ -1,26 +1,347 @@
 import os
-import httpx
+import time
+import heapq
+import random
+import asyncio
+from collections import OrderedDict
+from http_clients import get_client
+from metrics import stage_seconds
+from shared_state import shared_state
 
-SLACK_API_URL = "https://slack.com/api"
+SLACK_API_URL = os.getenv("SLACK_API_URL", "https://slack.com/api")
 SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_PR_REVIEW_TOKEN")
 
+SLACK_ID_CACHE_SIZE = int(os.getenv("SLACK_ID_CACHE_SIZE", "1000"))
+SLACK_ID_CACHE_TTL = float(os.getenv("SLACK_ID_CACHE_TTL", "3600"))
+SLACK_ID_NEGATIVE_TTL = float(os.getenv("SLACK_ID_NEGATIVE_TTL", "300"))
+SLACK_ID_WARMUP_CONCURRENCY = int(os.getenv("SLACK_ID_WARMUP_CONCURRENCY", "3"))
+SLACK_CHANNEL_RATE = float(os.getenv("SLACK_CHANNEL_RATE", "1"))  # messages per second per channel
+SLACK_CHANNEL_BURST = int(os.getenv("SLACK_CHANNEL_BURST", "1"))
+SLACK_MAX_RETRIES = int(os.getenv("SLACK_MAX_RETRIES", "4"))
+SLACK_DIGEST_THRESHOLD = int(os.getenv("SLACK_DIGEST_THRESHOLD", "5"))
+SLACK_DIGEST_MAX_ITEMS = 40  # keeps a digest under Slack's 50-block limit
+
+# Outbound priorities: lower goes first
+PRIORITY_HIGH = 0    # merges, conflicts, QA hand-offs
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2     # labels, milestones, assignment noise; may be collapsed into a digest
+
 print("SLACK_BOT_TOKEN = ", SLACK_BOT_TOKEN)
 
-async def get_slack_id_by_email(email: str) -> str | None:
+class SlackIdCache:
+    """Bounded TTL + LRU cache of email -> Slack user ID.
+
+    Unknown emails are cached as ``None`` for a shorter TTL, and concurrent
+    lookups for the same email share a single ``users.lookupByEmail`` call.
+    Local misses consult the shared ``state`` backend before Slack, so other
+    workers' lookups are reused.
+    """
+    def __init__(self, max_size: int, ttl: float, negative_ttl: float, state=shared_state):
+        self.max_size = max_size
+        self.state = state
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()  # email -> (slack_id | None, expires_at)
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, email: str) -> tuple[bool, str | None]:
+        entry = self._entries.get(email)
+        if entry is None:
+            return False, None
+        slack_id, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[email]
+            return False, None
+        self._entries.move_to_end(email)
+        return True, slack_id
+
+    def set(self, email: str, slack_id: str | None):
+        ttl = self.ttl if slack_id else self.negative_ttl
+        self._entries[email] = (slack_id, time.monotonic() + ttl)
+        self._entries.move_to_end(email)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def lookup(self, email: str, fetch) -> str | None:
+        hit, slack_id = self.get(email)
+        if hit:
+            self.hits += 1
+            return slack_id
+        self.misses += 1
+
+        task = self._inflight.get(email)
+        if task is None:
+            task = asyncio.create_task(self._fetch_and_store(email, fetch))
+            self._inflight[email] = task
+            task.add_done_callback(lambda _: self._inflight.pop(email, None))
+        # shield so one cancelled waiter does not cancel the lookup for the others
+        return await asyncio.shield(task)
+
+    async def _fetch_and_store(self, email: str, fetch) -> str | None:
+        if self.state.is_shared:
+            shared = await self.state.get(f"slack_id:{email}")
+            if shared is not None:
+                self.set(email, shared["id"])
+                return shared["id"]
+        slack_id, definitive = await fetch(email)
+        if definitive:
+            self.set(email, slack_id)
+            if self.state.is_shared:
+                await self.state.set(f"slack_id:{email}", {"id": slack_id}, ttl=self.ttl if slack_id else self.negative_ttl)
+        return slack_id
+
+slack_id_cache = SlackIdCache(SLACK_ID_CACHE_SIZE, SLACK_ID_CACHE_TTL, SLACK_ID_NEGATIVE_TTL)
+
+async def _lookup_slack_id(email: str) -> tuple[str | None, bool]:
+    """Return (slack_id, definitive). Only definitive answers are cached."""
     headers = {
         "Authorization": f"Bearer {SLACK_BOT_TOKEN}"
     }
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{SLACK_API_URL}/users.lookupByEmail?email={email}", headers=headers)
-        if response.status_code == 200:
-            data = response.json()
-            return data.get("user", {}).get("id")
-    return None
-
-async def send_slack_message(payload: dict):
+    client = get_client("slack")
+    response = await client.get(f"{SLACK_API_URL}/users.lookupByEmail?email={email}", headers=headers)
+    if response.status_code == 200:
+        data = response.json()
+        slack_id = data.get("user", {}).get("id")
+        return slack_id, bool(slack_id) or data.get("error") == "users_not_found"
+    return None, False
+
+async def get_slack_id_by_email(email: str) -> str | None:
+    if not email:
+        return None
+    return await slack_id_cache.lookup(email.strip().lower(), _lookup_slack_id)
+
+async def gather_bounded(coros, limit: int) -> list:
+    """Like asyncio.gather, but with at most ``limit`` coroutines in flight at once."""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(run(coro) for coro in coros))
+
+async def paginate(fetch_page, page_size: int, prefetch: bool = True):
+    """Async iterator over the items of a paged API, one page in memory at a time.
+
+    ``fetch_page(n)`` returns page ``n`` (0-based) as a list; a short or empty
+    page ends the iteration. With ``prefetch`` the next page is requested as
+    soon as a full page arrives, so it downloads while the caller works
+    through the current one. Stop early with ``contextlib.aclosing`` so the
+    prefetched request is cancelled right away.
+    """
+    page_number = 0
+    pending = asyncio.create_task(fetch_page(0))
+    try:
+        while pending is not None:
+            page = await pending
+            pending = None
+            if not page:
+                return
+            page_number += 1
+            if len(page) >= page_size:
+                pending = asyncio.create_task(fetch_page(page_number)) if prefetch else fetch_page(page_number)
+            for item in page:
+                yield item
+            del page
+    finally:
+        if isinstance(pending, asyncio.Task):
+            pending.cancel()
+        elif pending is not None:
+            pending.close()  # un-awaited coroutine
+
+async def warm_slack_id_cache(emails):
+    """Pre-resolve a set of emails so the first events after boot are cache hits."""
+    async def warm(email):
+        try:
+            await get_slack_id_by_email(email)
+        except Exception as e:
+            print(f"⚠️ Slack ID warm-up failed for {email}: {e}")
+
+    emails = {e for e in emails if isinstance(e, str) and e}
+    await gather_bounded([warm(email) for email in emails], SLACK_ID_WARMUP_CONCURRENCY)
+    print(f"🔥 Slack ID cache warmed with {len(emails)} email(s).")
+
+SLACK_STAGES = {"chat.postMessage": "slack_post", "chat.update": "slack_update"}
+
+async def call_slack_api(method: str, payload: dict) -> dict:
+    """POST to a Slack Web API method, honouring Retry-After (plus jitter) on 429."""
     headers = {
         "Authorization": f"Bearer {SLACK_BOT_TOKEN}",
         "Content-Type": "application/json"
     }
-    async with httpx.AsyncClient() as client:
-        await client.post(f"{SLACK_API_URL}/chat.postMessage", headers=headers, json=payload)
+    client = get_client("slack")
+    stage = SLACK_STAGES.get(method, method)
+    for attempt in range(SLACK_MAX_RETRIES + 1):
+        try:
+            with stage_seconds.time(stage=stage):
+                response = await client.post(f"{SLACK_API_URL}/{method}", headers=headers, json=payload)
+        except Exception as e:
+            print(f"[ERROR] Slack {method} request failed: ", e)
+            response = None
+        if response is not None and response.status_code != 429:
+            data = response.json() if response.status_code == 200 else {"ok": False, "error": f"http_{response.status_code}"}
+            if not data.get("ok"):
+                print(f"[ERROR] Slack {method} failed: {data.get('error')}")
+            return data
+        if attempt < SLACK_MAX_RETRIES:
+            retry_after = float(response.headers.get("Retry-After", 1)) if response is not None else 2 ** attempt
+            await asyncio.sleep(retry_after + random.uniform(0, 1))
+    return {"ok": False, "error": "retries_exhausted"}
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    async def take(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class SharedPacer:
+    """TokenBucket's counterpart across workers.
+
+    Time is cut into slots of ``1 / rate`` seconds and each take claims one of
+    the slot's ``burst`` places in the shared state, waiting for the next slot
+    when they are gone, so all workers together stay at ``rate``.
+    """
+    def __init__(self, state, name: str, rate: float, burst: int):
+        self.state = state
+        self.name = name
+        self.interval = 1 / rate
+        self.burst = burst
+
+    async def take(self):
+        slot = int(time.time() / self.interval)
+        while True:
+            wait = slot * self.interval - time.time()
+            for place in range(self.burst):
+                if await self.state.add(f"pace:{self.name}:{slot}:{place}", os.getpid(), ttl=max(wait, 0) + self.interval * 2):
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    return
+            slot = max(slot + 1, int(time.time() / self.interval))
+
+def _message_summary(payload: dict) -> str:
+    for block in payload.get("blocks", []):
+        text = (block.get("text") or {}).get("text")
+        if text:
+            return text
+    return payload.get("text", "")
+
+class SlackDispatcher:
+    """Paced chat.postMessage sender.
+
+    Every channel has its own priority queue drained through a token bucket
+    (Slack allows about one message per second per channel). With a shared
+    ``state`` backend the pace is kept across workers. When low-priority
+    messages pile up for a channel, they are collapsed into one digest message.
+    """
+    def __init__(self, rate: float = SLACK_CHANNEL_RATE, burst: int = SLACK_CHANNEL_BURST,
+                 digest_threshold: int = SLACK_DIGEST_THRESHOLD, state=shared_state):
+        self.state = state
+        self.rate = rate
+        self.burst = burst
+        self.digest_threshold = digest_threshold
+        self._queues: dict[str, list] = {}
+        self._buckets: dict[str, TokenBucket | SharedPacer] = {}
+        self._workers: dict[str, asyncio.Task] = {}
+        self._seq = 0
+        self.sent = 0
+        self.digested = 0
+
+    def submit(self, payload: dict, priority: int = PRIORITY_NORMAL, foldable: bool = True) -> asyncio.Future:
+        """Queue a message. Pass ``foldable=False`` when the caller needs this message's own ``ts``."""
+        channel = payload.get("channel") or ""
+        future = asyncio.get_running_loop().create_future()
+        self._seq += 1
+        heapq.heappush(self._queues.setdefault(channel, []), (priority, self._seq, payload, future, foldable))
+        if channel not in self._workers:
+            self._workers[channel] = asyncio.create_task(self._drain(channel))
+        return future
+
+    def depth(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def _drain(self, channel: str):
+        queue = self._queues[channel]
+        bucket = self._buckets.get(channel)
+        if bucket is None:
+            bucket = self._buckets[channel] = (
+                SharedPacer(self.state, f"slack:{channel}", self.rate, self.burst) if self.state.is_shared
+                else TokenBucket(self.rate, self.burst)
+            )
+        cancelled = False
+        try:
+            while queue:
+                await bucket.take()
+                priority, _, payload, future, foldable = heapq.heappop(queue)
+                batch = [(payload, future)]
+                if priority == PRIORITY_LOW and foldable:
+                    low = [item for item in queue if item[0] == PRIORITY_LOW and item[4]]
+                    if len(low) + 1 >= self.digest_threshold:
+                        low = sorted(low)[:SLACK_DIGEST_MAX_ITEMS - 1]
+                        for item in low:
+                            queue.remove(item)
+                        heapq.heapify(queue)
+                        batch += [(item[2], item[3]) for item in low]
+
+                if len(batch) > 1:
+                    self.digested += len(batch)
+                    payload = {
+                        "channel": channel,
+                        "text": f"🗂️ {len(batch)} PR updates",
+                        "blocks": [{"type": "section", "text": {"type": "mrkdwn", "text": f"🗂️ *{len(batch)} PR updates*"}}]
+                        + [{"type": "section", "text": {"type": "mrkdwn", "text": _message_summary(p)[:3000]}} for p, _ in batch],
+                    }
+
+                # Every waiter hears back, even when the post fails or the drain is cancelled
+                try:
+                    result = await call_slack_api("chat.postMessage", payload)
+                    self.sent += 1
+                except asyncio.CancelledError:
+                    result = {"ok": False, "error": "cancelled"}
+                    raise
+                except Exception as e:
+                    print(f"[ERROR] Slack post to {channel} failed: ", e)
+                    result = {"ok": False, "error": str(e)}
+                finally:
+                    for _, waiter in batch:
+                        if not waiter.done():
+                            waiter.set_result({**result, "digest": len(batch) > 1})
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            del self._workers[channel]
+            if queue and not cancelled:
+                self._workers[channel] = asyncio.create_task(self._drain(channel))  # e.g. bucket.take() failed
+            elif not queue:
+                self._queues.pop(channel, None)
+
+    async def drain(self, timeout: float = 10):
+        """Wait (bounded) for queued messages to go out, e.g. on shutdown."""
+        if self._workers:
+            await asyncio.wait(list(self._workers.values()), timeout=timeout)
+
+slack_dispatcher = SlackDispatcher()
+
+async def send_slack_message(payload: dict, priority: int = PRIORITY_NORMAL, wait: bool = False):
+    """Queue a chat.postMessage. With ``wait=True`` return Slack's response once it has been posted."""
+    # A waiting caller may edit its message later, so it must not end up inside a digest
+    future = slack_dispatcher.submit(payload, priority, foldable=not wait)
+    if wait:
+        return await future
+    return {"ok": True, "queued": True}
+
+async def update_slack_message(channel: str, ts: str, payload: dict):
+    return await call_slack_api("chat.update", {**payload, "channel": channel, "ts": ts})
@@ -0,0 +1,442 @@
+import os
+import math
+import time
+import zlib
+import uuid
+import socket
+import asyncio
+import sqlite3
+import threading
+import traceback
+from collections import deque, OrderedDict
+from events import loads, dumps
+from shared_state import shared_state
+
+WEBHOOK_QUEUE_BACKEND = os.getenv("WEBHOOK_QUEUE_BACKEND", "memory")  # memory | sqlite
+WEBHOOK_QUEUE_PATH = os.getenv("WEBHOOK_QUEUE_PATH", "webhook_queue.db")
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "4"))
+WEBHOOK_QUEUE_MAX = int(os.getenv("WEBHOOK_QUEUE_MAX", "1000"))
+WEBHOOK_DEDUPE_WINDOW = float(os.getenv("WEBHOOK_DEDUPE_WINDOW", "86400"))
+WEBHOOK_DEDUPE_MAX = int(os.getenv("WEBHOOK_DEDUPE_MAX", "10000"))
+WEBHOOK_DEDUPE_PATH = os.getenv("WEBHOOK_DEDUPE_PATH", "")  # empty -> in-memory only
+SHARED_PARTITIONS = int(os.getenv("SHARED_PARTITIONS", "16"))
+SHARED_LEASE_TTL = float(os.getenv("SHARED_LEASE_TTL", "15"))
+SHARED_POLL_INTERVAL = float(os.getenv("SHARED_POLL_INTERVAL", "0.5"))
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+class MemoryDeliveryStore:
+    """Keeps accepted deliveries in memory only; nothing survives a restart."""
+    def __init__(self):
+        self._next_id = 0
+
+    async def add(self, event_type: str, raw_body: bytes, key: str) -> int:
+        self._next_id += 1
+        return self._next_id
+
+    async def remove(self, delivery_id: int):
+        pass
+
+    async def pending(self) -> list:
+        return []
+
+    async def owners(self) -> list:
+        return []
+
+    async def adopt(self, owner: str) -> list:
+        return []
+
+    async def close(self):
+        pass
+
+class SqliteDeliveryStore:
+    """File-backed store: a delivery row lives until its handler has finished.
+
+    Rows are tagged with ``owner``, so several workers can share the file and
+    each replays only its own rows; rows of a worker that died are ``adopt``ed.
+    """
+    def __init__(self, path: str, owner: str = ""):
+        self.owner = owner
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS deliveries ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, event_type TEXT, body BLOB, key TEXT, owner TEXT DEFAULT '')"
+        )
+        if "owner" not in [column[1] for column in self._conn.execute("PRAGMA table_info(deliveries)")]:
+            self._conn.execute("ALTER TABLE deliveries ADD COLUMN owner TEXT DEFAULT ''")  # files from before owners
+        self._conn.commit()
+
+    def _execute(self, sql: str, params: tuple = ()):
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cursor
+
+    def _execute_returning(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+            self._conn.commit()
+            return rows
+
+    async def add(self, event_type: str, raw_body: bytes, key: str) -> int:
+        cursor = await asyncio.to_thread(
+            self._execute, "INSERT INTO deliveries (event_type, body, key, owner) VALUES (?, ?, ?, ?)",
+            (event_type, raw_body, key, self.owner),
+        )
+        return cursor.lastrowid
+
+    async def remove(self, delivery_id: int):
+        await asyncio.to_thread(self._execute, "DELETE FROM deliveries WHERE id = ?", (delivery_id,))
+
+    async def pending(self) -> list:
+        cursor = await asyncio.to_thread(
+            self._execute, "SELECT id, event_type, body, key FROM deliveries WHERE owner = ? ORDER BY id", (self.owner,)
+        )
+        return cursor.fetchall()
+
+    async def owners(self) -> list:
+        """Other owners with rows in the file."""
+        cursor = await asyncio.to_thread(self._execute, "SELECT DISTINCT owner FROM deliveries WHERE owner != ?", (self.owner,))
+        return [row[0] for row in cursor.fetchall()]
+
+    async def adopt(self, owner: str) -> list:
+        """Take over ``owner``'s rows; only one worker gets each row."""
+        rows = await asyncio.to_thread(
+            self._execute_returning,
+            "UPDATE deliveries SET owner = ? WHERE owner = ? RETURNING id, event_type, body, key", (self.owner, owner),
+        )
+        return sorted(rows)
+
+    async def close(self):
+        with self._lock:
+            self._conn.close()
+
+def create_delivery_store():
+    if WEBHOOK_QUEUE_BACKEND == "sqlite":
+        # Workers sharing state share the file too, so each must only replay its own rows
+        return SqliteDeliveryStore(WEBHOOK_QUEUE_PATH, WORKER_ID if shared_state.is_shared else "")
+    return MemoryDeliveryStore()
+
+class DeliveryDeduper:
+    """Bounded, time-windowed set of seen ``X-GitHub-Delivery`` IDs.
+
+    Lookups are O(1) against an in-memory ordered dict (oldest first), so
+    redeliveries are dropped before the body is read. With ``path`` set, IDs
+    are also written to SQLite and reloaded on startup. With a shared
+    ``state`` backend, a claim also has to win there, so a redelivery that
+    lands on another worker or replica is dropped too.
+    """
+    def __init__(self, window: float = WEBHOOK_DEDUPE_WINDOW, max_entries: int = WEBHOOK_DEDUPE_MAX,
+                 path: str = WEBHOOK_DEDUPE_PATH, state=shared_state):
+        self.window = window
+        self.state = state
+        self.max_entries = max_entries
+        self._seen = OrderedDict()  # delivery id -> first seen (epoch seconds)
+        self._conn = None
+        self._lock = threading.Lock()
+        self._writes: set[asyncio.Task] = set()
+        self.duplicates = 0
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS seen_deliveries (id TEXT PRIMARY KEY, seen_at REAL)")
+            self._conn.commit()
+
+    def _execute(self, sql: str, params: tuple = ()):
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cursor
+
+    def _prune(self, now: float):
+        while self._seen:
+            delivery_id, seen_at = next(iter(self._seen.items()))
+            if now - seen_at <= self.window and len(self._seen) <= self.max_entries:
+                break
+            self._seen.popitem(last=False)
+
+    def _persist(self, sql: str, params: tuple):
+        if self._conn is None:
+            return
+        task = asyncio.create_task(asyncio.to_thread(self._execute, sql, params))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    async def claim(self, delivery_id: str) -> bool:
+        """Record a delivery; False if it was already seen within the window."""
+        now = time.time()
+        self._prune(now)
+        if delivery_id in self._seen or (
+            self.state.is_shared and not await self.state.add(f"delivery:{delivery_id}", now, ttl=self.window)
+        ):
+            self.duplicates += 1
+            return False
+        self._seen[delivery_id] = now
+        if len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+        self._persist("INSERT OR REPLACE INTO seen_deliveries (id, seen_at) VALUES (?, ?)", (delivery_id, now))
+        return True
+
+    async def release(self, delivery_id: str):
+        """Forget a claimed delivery that was not accepted, so GitHub's retry goes through."""
+        if self._seen.pop(delivery_id, None) is not None:
+            self._persist("DELETE FROM seen_deliveries WHERE id = ?", (delivery_id,))
+            if self.state.is_shared:
+                await self.state.delete(f"delivery:{delivery_id}")
+
+    async def start(self):
+        if self._conn is None:
+            return
+        cutoff = time.time() - self.window
+        await asyncio.to_thread(self._execute, "DELETE FROM seen_deliveries WHERE seen_at < ?", (cutoff,))
+        cursor = await asyncio.to_thread(
+            self._execute, "SELECT id, seen_at FROM seen_deliveries ORDER BY seen_at DESC LIMIT ?", (self.max_entries,)
+        )
+        for delivery_id, seen_at in reversed(cursor.fetchall()):
+            self._seen[delivery_id] = seen_at
+        print(f"🧾 Loaded {len(self._seen)} recent webhook delivery IDs.")
+
+    async def close(self):
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+
+    def stats(self) -> dict:
+        return {"tracked": len(self._seen), "duplicates": self.duplicates}
+
+class WebhookDispatcher:
+    """Bounded worker pool draining accepted webhooks.
+
+    Deliveries are grouped into lanes by ordering key (``repo#pr``). A lane is
+    handled by at most one worker at a time, so events for the same PR run in
+    arrival order while different PRs run in parallel.
+    """
+    def __init__(self, handler, store, workers: int = WEBHOOK_WORKERS, max_depth: int = WEBHOOK_QUEUE_MAX):
+        self.handler = handler
+        self.store = store
+        self.workers = workers
+        self.max_depth = max_depth
+        self._lanes: dict[str, deque] = {}
+        self._ready: asyncio.Queue = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+        self.depth = 0
+        self.in_flight = 0
+        self.processed = 0
+        self.failed = 0
+
+    def is_full(self) -> bool:
+        return self.depth >= self.max_depth
+
+    def _enqueue(self, delivery_id: int, event_type: str, raw_body: bytes, key: str, event=None):
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = deque()
+            self._ready.put_nowait(key)  # lane idle -> make it runnable
+        lane.append((delivery_id, event_type, raw_body, event))
+        self.depth += 1
+
+    async def submit(self, event_type: str, raw_body: bytes, key: str, event=None) -> bool:
+        """Queue a delivery. ``event`` is the already parsed record, if the caller has one; only the body is stored."""
+        if self.is_full():
+            return False
+        delivery_id = await self.store.add(event_type, raw_body, key)
+        self._enqueue(delivery_id, event_type, raw_body, key, event)
+        return True
+
+    async def start(self):
+        replayed = await self.store.pending()
+        for delivery_id, event_type, raw_body, key in replayed:
+            self._enqueue(delivery_id, event_type, raw_body, key)
+        if replayed:
+            print(f"♻️ Replaying {len(replayed)} unprocessed webhook deliveries.")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        print(f"👷 Webhook dispatcher started with {self.workers} workers.")
+
+    async def drain(self, timeout: float = 10):
+        """Wait (bounded) for queued and in-flight deliveries to finish, e.g. on shutdown."""
+        deadline = time.monotonic() + timeout
+        while (self.depth or self.in_flight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.store.close()
+
+    async def _worker(self):
+        while True:
+            key = await self._ready.get()
+            lane = self._lanes[key]
+            delivery_id, event_type, raw_body, event = lane.popleft()
+            self.depth -= 1
+            self.in_flight += 1
+            finished = False  # stays False when cancelled at shutdown, so the row is replayed on the next start
+            try:
+                await self.handler(raw_body, event_type, event)
+                self.processed += 1
+                finished = True
+            except Exception as e:
+                self.failed += 1
+                finished = True
+                print(f"[ERROR] Webhook delivery {delivery_id} failed: ", e)
+                traceback.print_exc()
+            finally:
+                self.in_flight -= 1
+                if finished:
+                    try:
+                        await self.store.remove(delivery_id)
+                    except Exception as e:
+                        # The row is replayed on the next start; this PR's lane must keep moving meanwhile
+                        print(f"[ERROR] Could not remove webhook delivery {delivery_id} from the store: ", e)
+                if lane:
+                    self._ready.put_nowait(key)  # more work for this PR, go to the back of the line
+                else:
+                    del self._lanes[key]
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.store).__name__,
+            "workers": self.workers,
+            "depth": self.depth,
+            "in_flight": self.in_flight,
+            "active_lanes": len(self._lanes),
+            "processed": self.processed,
+            "failed": self.failed,
+            "max_depth": self.max_depth,
+        }
+
+def partition_of(key: str, partitions: int = SHARED_PARTITIONS) -> int:
+    # crc32 rather than hash(): it has to agree across processes
+    return zlib.crc32(key.encode()) % partitions
+
+class PartitionedIntake:
+    """Routes accepted deliveries through the shared state so each PR has one owner.
+
+    Ordering keys (``repo#pr``) hash into ``partitions`` shared queues. Every
+    worker process holds TTL leases on an even share of the partitions and
+    feeds only those into its local dispatcher, so one process sees all events
+    of a PR: its debounce buffers, ordering lane and Slack messages stay
+    correct with any number of uvicorn workers or replicas. Leases of a dead
+    worker expire and are picked up by the others.
+    """
+    def __init__(self, dispatcher: WebhookDispatcher, state=shared_state, partitions: int = SHARED_PARTITIONS,
+                 lease_ttl: float = SHARED_LEASE_TTL, poll_interval: float = SHARED_POLL_INTERVAL):
+        self.dispatcher = dispatcher
+        self.state = state
+        self.partitions = partitions
+        self.lease_ttl = lease_ttl
+        self.poll_interval = poll_interval
+        self.worker_id = WORKER_ID
+        self.owned: set[int] = set()
+        self._locks = [asyncio.Lock() for _ in range(partitions)]
+        self._tasks: list[asyncio.Task] = []
+        self.forwarded = 0
+
+    async def submit(self, event_type: str, raw_body: bytes, key: str, event=None) -> bool:
+        partition = partition_of(key, self.partitions)
+        queue = f"deliveries:{partition}"
+        # Shared with the pump, so a delivery it has popped but not handed over yet cannot be overtaken
+        async with self._locks[partition]:
+            # Owned and nothing queued ahead of it: skip the shared queue round trip
+            if partition in self.owned and not await self.state.length(queue):
+                return await self.dispatcher.submit(event_type, raw_body, key, event)
+            await self.state.push(queue, dumps({"event_type": event_type, "body": raw_body.decode("utf-8"), "key": key}))
+        self.forwarded += 1
+        return True
+
+    async def _rebalance(self):
+        await self.state.set(f"worker:{self.worker_id}", 1, ttl=self.lease_ttl)
+        fair_share = math.ceil(self.partitions / max(await self.state.count("worker:"), 1))
+        for partition in list(self.owned):
+            if not await self.state.renew(f"partition:{partition}", self.worker_id, self.lease_ttl):
+                self.owned.discard(partition)
+                print(f"[WARN] Lost lease on webhook partition {partition}.")
+        for partition in sorted(self.owned)[fair_share:]:
+            await self.state.delete(f"partition:{partition}", self.worker_id)  # hand back to a newer worker
+            self.owned.discard(partition)
+        start = zlib.crc32(self.worker_id.encode())  # spread workers over different first picks
+        for offset in range(self.partitions):
+            if len(self.owned) >= fair_share:
+                break
+            partition = (start + offset) % self.partitions
+            if partition not in self.owned and await self.state.add(f"partition:{partition}", self.worker_id, ttl=self.lease_ttl):
+                self.owned.add(partition)
+        await self._requeue_orphans()
+
+    async def _requeue_orphans(self):
+        """Deliveries a dead worker had taken but not finished go back through the shared partitions."""
+        store = self.dispatcher.store
+        for owner in await store.owners():
+            if await self.state.get(f"worker:{owner}") is not None:
+                continue  # still alive: its rows are in flight
+            rows = await store.adopt(owner)
+            for delivery_id, event_type, raw_body, key in rows:
+                queue = f"deliveries:{partition_of(key, self.partitions)}"
+                await self.state.push(queue, dumps({"event_type": event_type, "body": bytes(raw_body).decode("utf-8"), "key": key}))
+                await store.remove(delivery_id)
+            if rows:
+                print(f"♻️ Requeued {len(rows)} unprocessed webhook deliveries of worker {owner or '(unnamed)'}.")
+
+    async def _lease_loop(self):
+        while True:
+            try:
+                await self._rebalance()
+            except Exception as e:
+                print("[ERROR] Partition rebalance failed: ", e)
+            await asyncio.sleep(self.lease_ttl / 3)
+
+    async def _pull(self, partition: int) -> bool:
+        """Hand the oldest delivery of a partition to the dispatcher; it goes back to the front if that fails."""
+        queue = f"deliveries:{partition}"
+        async with self._locks[partition]:
+            item = await self.state.pop(queue)
+            if item is None:
+                return False
+            try:
+                delivery = loads(item)
+                if await self.dispatcher.submit(delivery["event_type"], delivery["body"].encode("utf-8"), delivery["key"]):
+                    return True
+            except Exception as e:
+                print(f"[ERROR] Handing over a delivery from partition {partition} failed: ", e)
+            await self.state.push_front(queue, item)
+            return False
+
+    async def _pump(self):
+        idle = self.poll_interval
+        while True:
+            moved = False
+            try:
+                for partition in list(self.owned):
+                    if self.dispatcher.is_full():
+                        break
+                    if not await self._pull(partition):
+                        continue
+                    moved = True
+            except Exception as e:
+                print("[ERROR] Pulling shared webhook deliveries failed: ", e)
+            # Drain quickly while there is work, back off when the queues are empty
+            idle = 0 if moved else min(max(idle * 2, 0.05), self.poll_interval)
+            await asyncio.sleep(idle)
+
+    async def start(self):
+        await self._rebalance()
+        self._tasks = [asyncio.create_task(self._lease_loop()), asyncio.create_task(self._pump())]
+        print(f"🧩 Worker {self.worker_id} owns webhook partitions {sorted(self.owned)} of {self.partitions}.")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for partition in self.owned:
+            await self.state.delete(f"partition:{partition}", self.worker_id)
+        self.owned.clear()
+        await self.state.delete(f"worker:{self.worker_id}")
+
+    def stats(self) -> dict:
+        return {"worker": self.worker_id, "partitions": self.partitions, "owned": sorted(self.owned), "forwarded": self.forwarded}
@@ -1,8 +1,16 @@
 import os
-from datetime import datetime, timedelta, timezone
+import re
+import json
 import time
-import requests
+import asyncio
+from collections import deque, OrderedDict
+from contextlib import aclosing
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
+from http_clients import get_client
+from github_api import github, GITHUB_API_BASE
+from shared_state import shared_state
+from utils import paginate
 
 load_dotenv()
 
@@ -17,51 +25,187 @@ CLIENT_ID = os.getenv("ZOHO_CLIENT_ID")
 CLIENT_SECRET = os.getenv("ZOHO_CLIENT_SECRET")
 PORTAL_NAME = os.getenv("ZOHO_PORTAL_NAME")
 PORTAL_ID = 0
-GIT_REPO_TOKEN = os.getenv("GITHUB_TOKEN")
+ZOHO_API_URL = os.getenv("ZOHO_API_URL", "https://projectsapi.zoho.in/restapi")
+ZOHO_ACCOUNTS_URL = os.getenv("ZOHO_ACCOUNTS_URL", "https://accounts.zoho.in")
+TASK_INDEX_PATH = os.getenv("ZOHO_TASK_INDEX_PATH", "zoho_task_index.json")
+TOKEN_REFRESH_MARGIN = float(os.getenv("ZOHO_TOKEN_REFRESH_MARGIN", "120"))
+DEFAULT_TOKEN_LIFESPAN = 540  # used when Zoho omits expires_in
+TOKEN_LOCK_TTL = 30  # seconds another worker waits for a shared refresh before fetching itself
+TASK_INDEX_LOCK_TTL = 600  # upper bound on one worker's index scan; long enough for a full scan under the rate limit
+ZOHO_WRITE_CONCURRENCY = int(os.getenv("ZOHO_WRITE_CONCURRENCY", "5"))
+ZOHO_RATE_LIMIT = int(os.getenv("ZOHO_RATE_LIMIT", "100"))  # requests per window, per portal
+ZOHO_RATE_WINDOW = float(os.getenv("ZOHO_RATE_WINDOW", "120"))
+ZOHO_TASK_SEARCH = os.getenv("ZOHO_TASK_SEARCH", "true").lower() == "true"
+ZOHO_SEARCH_MAX_TERMS = int(os.getenv("ZOHO_SEARCH_MAX_TERMS", "5"))  # more misses than this -> one index refresh instead
+ZOHO_FORCED_SCAN_COOLDOWN = float(os.getenv("ZOHO_FORCED_SCAN_COOLDOWN", "600"))  # min seconds between full rescans on a miss
+MERGED_PR_CACHE_SIZE = int(os.getenv("MERGED_PR_CACHE_SIZE", "200"))  # (repo, base branch) pairs kept
+ZOHO_SCAN_CONCURRENCY = int(os.getenv("ZOHO_SCAN_CONCURRENCY", "4"))  # projects streamed side by side during a scan
+ZOHO_TASK_MISS_TTL = float(os.getenv("ZOHO_TASK_MISS_TTL", "300"))  # seconds a key that was not found is not looked up again
+TASK_KEY_PATTERN = re.compile(os.getenv("ZOHO_TASK_KEY_PATTERN", r"[A-Za-z0-9]+-T\d+"))  # branch names that can be task keys
+TOKEN_PATTERN = re.compile(r"\w+")
 
 print("CLIENT_ID = ", CLIENT_ID)
 # class TaskUpdateRequest(BaseModel):
     # partial_title: str
 class ZohoTokenManager:
-    def __init__(self):
+    """Async Zoho OAuth token provider.
+
+    Honours the ``expires_in`` returned by Zoho, refreshes in the background
+    ``refresh_margin`` before expiry, and lets concurrent callers share a
+    single in-flight refresh. With a shared ``state`` backend the token is
+    shared too: one worker fetches under a lock, the others adopt its token.
+    """
+    def __init__(self, refresh_margin: timedelta = timedelta(seconds=TOKEN_REFRESH_MARGIN), state=shared_state):
+        self.state = state
         self.access_token = None
-        self.token_generated_time = None
-        self.token_lifespan = timedelta(minutes=9)
-
-    def get_access_token(self):
-        if not self.access_token or self.is_token_expired():
-            self.access_token = self._fetch_new_token()
-            self.token_generated_time = datetime.now(timezone.utc)
+        self.expires_at = None
+        self.lifespan = 0  # seconds the current token was valid for when we got it
+        self.refresh_margin = refresh_margin
+        self._refresh_task = None
+        self._background_task = None
+
+    async def get_access_token(self, stale_token: str | None = None):
+        """Return a valid token. Pass the token that just got a 401 as ``stale_token`` to force a refresh."""
+        if not self.access_token or self.is_token_expired() or (stale_token and stale_token == self.access_token):
+            await self.refresh(stale_token)
         return self.access_token
 
     def is_token_expired(self):
-        if not self.token_generated_time:
+        if not self.expires_at:
             return True
-        return datetime.now(timezone.utc) - self.token_generated_time > self.token_lifespan
+        return datetime.now(timezone.utc) >= self.expires_at
+
+    async def refresh(self, stale_token: str | None = None):
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh(stale_token or self.access_token))
+            self._refresh_task.add_done_callback(lambda _: setattr(self, "_refresh_task", None))
+        await asyncio.shield(self._refresh_task)
+
+    async def _refresh(self, stale_token: str | None = None):
+        locked = False
+        if self.state.is_shared:
+            if await self._adopt_shared(stale_token):
+                return
+            locked = await self.state.add("zoho:token:lock", os.getpid(), ttl=TOKEN_LOCK_TTL)
+            if not locked:
+                # Another worker is fetching; wait for its token rather than fetching a second one
+                for _ in range(TOKEN_LOCK_TTL):
+                    await asyncio.sleep(1)
+                    if await self._adopt_shared(stale_token):
+                        return
+        try:
+            token, expires_in = await self._fetch_new_token()
+            self.access_token = token
+            self.expires_at = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
+            self.lifespan = expires_in
+            if self.state.is_shared:
+                await self.state.set("zoho:token", {"token": token, "expires_at": self.expires_at.timestamp()}, ttl=expires_in)
+        finally:
+            if locked:
+                # Also on failure, so the other workers stop waiting and try themselves
+                await self.state.delete("zoho:token:lock", os.getpid())
+
+    async def _adopt_shared(self, stale_token: str | None) -> bool:
+        shared = await self.state.get("zoho:token")
+        if not shared or shared["token"] == stale_token:
+            return False
+        expires_at = datetime.fromtimestamp(shared["expires_at"], timezone.utc)
+        if expires_at - datetime.now(timezone.utc) <= self.refresh_margin:
+            return False  # about to expire; fetch a new one
+        self.access_token = shared["token"]
+        self.expires_at = expires_at
+        self.lifespan = (expires_at - datetime.now(timezone.utc)).total_seconds()
+        return True
 
-    def _fetch_new_token(self):
-        url = 'https://accounts.zoho.in/oauth/v2/token'
+    async def _fetch_new_token(self):
+        url = f'{ZOHO_ACCOUNTS_URL}/oauth/v2/token'
         data = {
             'grant_type': 'client_credentials',
             'client_id': CLIENT_ID,
             'client_secret': CLIENT_SECRET,
             'scope': 'ZohoProjects.tasks.ALL,ZohoProjects.projects.ALL,ZohoProjects.portals.ALL,ZohoProjects.users.ALL',
         }
-        response = requests.post(url, data=data)
-        if response.status_code == 200:
+        response = await get_client("zoho").post(url, data=data)
+        body = response.json() if response.status_code == 200 else {}
+        if body.get('access_token'):
             print("✅ Refreshed Zoho token.")
-            return response.json().get('access_token')
+            return body['access_token'], int(body.get('expires_in') or DEFAULT_TOKEN_LIFESPAN)
         else:
             raise Exception("❌ Access token error: " + response.text)
 
+    async def _keep_fresh(self):
+        while True:
+            if self.expires_at:
+                wait = (self.expires_at - self.refresh_margin - datetime.now(timezone.utc)).total_seconds()
+                # A token that lives no longer than the margin would otherwise be refreshed back to back
+                await asyncio.sleep(max(wait, self.lifespan / 2, 5))
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(str(e))
+                await asyncio.sleep(10)
+
+    def start(self):
+        """Refresh ahead of expiry so requests never wait on a token fetch."""
+        if self._background_task is None:
+            self._background_task = asyncio.create_task(self._keep_fresh())
+
+    async def stop(self):
+        if self._background_task:
+            self._background_task.cancel()
+            await asyncio.gather(self._background_task, return_exceptions=True)
+            self._background_task = None
+
 token_manager = ZohoTokenManager()
 
-def get_portal_id_by_name(access_token: str, portal_name: str) -> str:
-    url = "https://projectsapi.zoho.in/restapi/portals/"
-    headers = {
-        "Authorization": f"Zoho-oauthtoken {access_token}"
-    }
-    response = requests.get(url, headers=headers)
+class RateLimiter:
+    """Sliding-window limiter: at most ``limit`` calls in any ``window`` seconds."""
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self._calls = deque()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= self.window:
+                    self._calls.popleft()
+                if len(self._calls) < self.limit:
+                    self._calls.append(now)
+                    return
+                await asyncio.sleep(self.window - (now - self._calls[0]))
+
+# Zoho limits API calls per portal; one limiter per portal ID
+portal_limiters: dict = {}
+
+async def zoho_request(method: str, url: str, headers: dict | None = None, **kwargs):
+    """Send an authenticated, rate-limited Zoho request.
+
+    Retries once with a fresh token on 401 and waits out ``Retry-After`` on 429.
+    """
+    limiter = portal_limiters.setdefault(PORTAL_ID, RateLimiter(ZOHO_RATE_LIMIT, ZOHO_RATE_WINDOW))
+    token = await token_manager.get_access_token()
+    token_retried = False
+    for attempt in range(4):
+        await limiter.acquire()
+        request_headers = {**(headers or {}), "Authorization": f"Zoho-oauthtoken {token}"}
+        response = await get_client("zoho").request(method, url, headers=request_headers, **kwargs)
+        if response.status_code == 401 and not token_retried:
+            token_retried = True
+            token = await token_manager.get_access_token(stale_token=token)
+        elif response.status_code == 429 and attempt < 3:
+            retry_after = float(response.headers.get("Retry-After") or 2 ** attempt)
+            print(f"[WARN] Zoho rate limit hit, retrying in {retry_after:.0f}s")
+            await asyncio.sleep(retry_after)
+        else:
+            return response
+    return response
+
+async def get_portal_id_by_name(portal_name: str) -> str:
+    url = f"{ZOHO_API_URL}/portals/"
+    response = await zoho_request("GET", url)
     
     if response.status_code == 200:
         portals = response.json().get("portals", [])
@@ -77,72 +221,90 @@ def get_portal_id_by_name(access_token: str, portal_name: str) -> str:
     else:
         raise Exception(f"❌ Failed to fetch portals: {response.text}")
         
-def get_zoho_projects(access_token):
-    url = f'https://projectsapi.zoho.in/restapi/portal/{PORTAL_ID}/projects/'
-    headers = {'Authorization': f'Zoho-oauthtoken {access_token}'}
-    response = requests.get(url, headers=headers)
+async def get_zoho_projects():
+    url = f'{ZOHO_API_URL}/portal/{PORTAL_ID}/projects/'
+    response = await zoho_request("GET", url)
     return response.json().get("projects", []) if response.status_code == 200 else []
 
-def get_tasks_for_project(access_token, project_id):
-    url = f'https://projectsapi.zoho.in/restapi/portal/{PORTAL_ID}/projects/{project_id}/tasks/'
-    headers = {'Authorization': f'Zoho-oauthtoken {access_token}'}
-    response = requests.get(url, headers=headers)
-    return response.json().get("tasks", []) if response.status_code == 200 else []
-
-def find_task_by_partial_title(access_token, partial_title):
-    projects = get_zoho_projects(access_token)
-    for proj in projects:
-        project_id = proj["id"]
-        tasks = get_tasks_for_project(access_token, project_id)
-        for task in tasks:
-            if partial_title in task.get("name", ""):
-                return {
-                    "project_id": project_id,
-                    "task_id": task["id"],
-                    "task_title": task["name"]
-                }
-    return None
-
-def get_task_statuses(access_token, project_id):
-    url = f"https://projectsapi.zoho.in/restapi/portal/{PORTAL_ID}/projects/{project_id}/taskstatuses/"
-    headers = {'Authorization': f'Zoho-oauthtoken {access_token}'}
-    response = requests.get(url, headers=headers)
-    return response.json().get("taskstatuses", []) if response.status_code == 200 else []
-
-def fetch_all_tasks_in_project(access_token: str, project_id: str) -> list:
-    headers = {'Authorization': f'Zoho-oauthtoken {access_token}'}
-    all_tasks = []
-    index = 1
-    range_size = 200  # max range size as per Zoho API
-
-    while True:
-        task_url = (
-            f"https://projectsapi.zoho.in/restapi/portal/{PORTAL_ID}/projects/{project_id}/tasks/"
-            f"?index={index}&range={range_size}"
-        )
-        response = requests.get(task_url, headers=headers)
-
-        if response.status_code != 200:
-            print(f"Failed to fetch tasks for project {project_id}: {response.text}")
-            break
-
-        tasks = response.json().get("tasks", [])
-        all_tasks.extend(tasks)
-
-        if len(tasks) < range_size:
-            break  # No more pages
-        index += range_size
-
-    return all_tasks
+async def find_task_by_partial_title(partial_title):
+    match = await task_index.find_title(partial_title)
+    if not match:
+        return None
+    _, task = match
+    return {
+        "project_id": task["project_id"],
+        "task_id": task["task_id"],
+        "task_title": task["title"]
+    }
 
-def comment_on_task(access_token, portal_id, project_id, task_id, content):
+ZOHO_TASK_PAGE_SIZE = 200  # max range size as per Zoho API
+
+async def _fetch_task_page(project_id: str, page_number: int) -> list:
+    """One page of a project's tasks. Raises when Zoho fails, which is not the same as the end of the list."""
+    index = page_number * ZOHO_TASK_PAGE_SIZE + 1
+    task_url = (
+        f"{ZOHO_API_URL}/portal/{PORTAL_ID}/projects/{project_id}/tasks/"
+        f"?index={index}&range={ZOHO_TASK_PAGE_SIZE}"
+    )
+    response = await zoho_request("GET", task_url)
+
+    if response.status_code == 204:
+        return []  # past the last task
+    if response.status_code != 200:
+        raise Exception(f"❌ Failed to fetch tasks for project {project_id}: {response.text}")
+    return response.json().get("tasks", [])
+
+def iter_project_tasks(project_id: str):
+    """Stream a project's tasks page by page; break out as soon as the caller has what it needs."""
+    return paginate(lambda page_number: _fetch_task_page(project_id, page_number), ZOHO_TASK_PAGE_SIZE)
+
+async def scan_projects(project_ids, on_task, on_project, concurrency: int = ZOHO_SCAN_CONCURRENCY) -> bool:
+    """Stream every task of ``project_ids``, reading up to ``concurrency`` projects side by side.
+
+    Each project goes through ``iter_project_tasks``, so only its current page
+    and the one prefetched behind it are held, however large the project is.
+    ``on_task(project_id, task)`` sees every task; once it returns True the
+    rest of the scan is cancelled and True is returned. ``on_project(project_id)``
+    runs for each project read to the end; a project with a failed page is
+    skipped. Zoho's rate limit is respected through ``zoho_request``.
+    """
+    queue = deque(project_ids)
+    stopped = False
+
+    async def worker():
+        nonlocal stopped
+        while queue and not stopped:
+            project_id = queue.popleft()
+            try:
+                async with aclosing(iter_project_tasks(project_id)) as tasks:
+                    async for task in tasks:
+                        if on_task(project_id, task):
+                            stopped = True
+                            return
+            except Exception as e:
+                print(f"[ERROR] Fetching tasks for project {project_id} failed: ", e)
+                continue
+            on_project(project_id)
+
+    running = {asyncio.create_task(worker()) for _ in range(min(concurrency, len(queue)))}
+    try:
+        while running and not stopped:
+            done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        return stopped
+    finally:
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+async def comment_on_task(portal_id, project_id, task_id, content):
     if len(content) == 0:
         return True
     
-    url = f"https://projectsapi.zoho.in/restapi/portal/{portal_id}/projects/{project_id}/tasks/{task_id}/comments/"
+    url = f"{ZOHO_API_URL}/portal/{portal_id}/projects/{project_id}/tasks/{task_id}/comments/"
     
     headers = {
-        "Authorization": f"Zoho-oauthtoken {access_token}",
         "Content-Type": "application/json"
     }
     
@@ -151,148 +313,518 @@ def comment_on_task(access_token, portal_id, project_id, task_id, content):
             #f"🔗 [View Pull Request]({pr_url})"
     }
 
-    response = requests.post(url, headers=headers, params=payload)
+    response = await zoho_request("POST", url, headers=headers, params=payload)
     print("Status:", response.status_code)
     print("Response:", response.text)
 
     return response.status_code == 200
     
-def update_status_with_task_key(task_key: str, target_status_name: str = "Ready for Review", comment: str = f"Nothing to say") -> dict:
-    access_token = token_manager.get_access_token()
-    projects = get_zoho_projects(access_token)
-
-    for proj in projects:
-        project_id = proj["id"]
-        tasks = fetch_all_tasks_in_project(access_token, project_id)
-        # with open("{}.json".format(proj["name"]), "w", encoding="utf-8") as f:
-            # json.dump(tasks, f, indent=4, ensure_ascii=False)
-        for task in tasks:
-            if task.get("key") == task_key:
-                task_id = task["id"]
-                task_title = task.get("name")
-
-                # Update status
-                update_url = f"https://projectsapi.zoho.in/restapi/portal/{PORTAL_ID}/projects/{project_id}/tasks/{task_id}/"
-                headers = {
-                    'Authorization': f'Zoho-oauthtoken {token_manager.get_access_token()}',
-                    'Content-Type': 'application/json'
-                }
-                payload = {"custom_status": STATUS_MAP.get(target_status_name)}
-                response = requests.post(update_url, headers=headers, params=payload)
-                
-                comment_on_task(access_token, PORTAL_ID, project_id, task_id, comment)
-                
-                return {
-                    "success": response.status_code == 200,
-                    "project_id": project_id,
-                    "task_id": task_id,
-                    "task_title": task_title,
-                    "message": "✅ Status updated successfully"
-                    if response.status_code == 200 else f"❌ Update failed: {response.text}"
-                }
-                
-    return {"success": False, "message": f"❌ Task with key '{task_key}' not found in any project."}
+_search_supported = ZOHO_TASK_SEARCH
 
-# def update_task_status(access_token, project_id, task_id, status_name):
-#     update_url = f"https://projectsapi.zoho.in/restapi/portal/{PORTAL_ID}/projects/{project_id}/tasks/{task_id}/"
-#     headers = {
-#         'Authorization': f'Zoho-oauthtoken {access_token}',
-#         'Content-Type': 'application/json'
-#     }
-#     payload = {"custom_status": STATUS_MAP.get(status_name)}
-#     response = requests.post(update_url, headers=headers, params=payload)
-#     print(f"🔁 Updated Task ID {task_id} to '{status_name}': {response.status_code}")
-
-def get_merged_prs(repo_full_name: str, TARGET_BRANCH: str, DAYS_LOOKBACK: int = 2):
-    since_dt = datetime.now(timezone.utc) - timedelta(days=DAYS_LOOKBACK)
+async def search_tasks(term: str) -> list | None:
+    """Zoho's portal-wide task search. Returns ``(project_id, task)`` pairs, or None when search is unavailable."""
+    global _search_supported
+    if not _search_supported:
+        return None
+    url = f"{ZOHO_API_URL}/portal/{PORTAL_ID}/search"
+    response = await zoho_request("GET", url, params={"search_term": term, "module": "tasks", "index": 1, "range": 100})
+    if response.status_code == 204:
+        return []  # Zoho answers an empty search with No Content
+    if response.status_code in (400, 404):
+        _search_supported = False
+        print(f"[WARN] Zoho task search unavailable ({response.status_code}); using the local task index only.")
+        return None
+    if response.status_code != 200:
+        return None
+    return [
+        (str(task["project"]["id"]), task)
+        for task in response.json().get("tasks", [])
+        if (task.get("project") or {}).get("id")
+    ]
+
+def _title_tokens(text: str) -> set:
+    return set(TOKEN_PATTERN.findall((text or "").lower()))
+
+class ZohoTaskIndex:
+    """Persistent task key -> (project_id, task_id, link) index.
+
+    Built once from a full scan and kept on disk. Afterwards only projects whose
+    ``updated_date_long`` changed since the last scan are fetched again, so a
+    lookup normally costs no Zoho calls at all. An inverted index over title
+    tokens serves partial-title searches without walking every task. With a
+    shared ``state`` backend one worker scans Zoho at a time and publishes the
+    result, and the others adopt it instead of scanning themselves.
+    """
+    def __init__(self, path: str, state=shared_state):
+        self.path = path
+        self.state = state
+        self.version = None  # version of the shared copy last adopted or published
+        self.projects = {}  # project_id -> last seen project modified stamp
+        self.tasks = {}     # task key -> {"project_id", "task_id", "title", "link"}
+        self._project_keys: dict[str, set] = {}  # project_id -> task keys
+        self._tokens: dict[str, set] = {}        # lower-cased title token -> task keys
+        self._refresh_lock = asyncio.Lock()
+        self._forced_scan_after = 0.0  # monotonic time the next miss may rescan unchanged projects
+        self._absent: dict[str, float] = {}  # task key -> monotonic time its miss expires
+        self._forgotten: dict[str, str] = {}  # stale task key -> project_id, until that project is rescanned
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._restore(json.load(f))
+            print(f"📇 Loaded Zoho task index: {len(self.tasks)} tasks in {len(self.projects)} projects.")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Could not load Zoho task index: {e}")
+
+    def _restore(self, data: dict):
+        self.projects = data.get("projects", {})
+        self.tasks, self._project_keys, self._tokens = {}, {}, {}
+        for task_key, entry in data.get("tasks", {}).items():
+            self._put(task_key, entry)
+        for task_key, project_id in self._forgotten.items():
+            self._drop(task_key)
+            self.projects.pop(project_id, None)
+
+    async def sync(self):
+        """Adopt the copy another worker published, if it is newer than ours."""
+        if not self.state.is_shared or await self.state.get("zoho:task_index:version") in (None, self.version):
+            return
+        data = await self.state.get("zoho:task_index")
+        if data:
+            self._restore(data)
+            self.version = data["version"]
+
+    async def _publish(self):
+        self.version = time.time()
+        await self.state.set("zoho:task_index", {"version": self.version, "projects": self.projects, "tasks": self.tasks})
+        await self.state.set("zoho:task_index:version", self.version)
+
+    def save(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"projects": self.projects, "tasks": self.tasks}, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"⚠️ Could not save Zoho task index: {e}")
+
+    def _put(self, task_key: str, entry: dict):
+        self._drop(task_key)
+        self.tasks[task_key] = entry
+        self._project_keys.setdefault(str(entry["project_id"]), set()).add(task_key)
+        for token in _title_tokens(entry.get("title")):
+            self._tokens.setdefault(token, set()).add(task_key)
+
+    def _drop(self, task_key: str) -> dict | None:
+        entry = self.tasks.pop(task_key, None)
+        if entry:
+            self._project_keys.get(str(entry["project_id"]), set()).discard(task_key)
+            for token in _title_tokens(entry.get("title")):
+                keys = self._tokens.get(token)
+                if keys is not None:
+                    keys.discard(task_key)
+                    if not keys:
+                        del self._tokens[token]
+        return entry
+
+    def get(self, task_key: str) -> dict | None:
+        return self.tasks.get(task_key)
+
+    def forget(self, task_key: str):
+        task = self._drop(task_key)
+        if task:
+            # Force the owning project to be rescanned on the next refresh, even if a shared copy still lists the task
+            self._forgotten[task_key] = str(task["project_id"])
+            self.projects.pop(str(task["project_id"]), None)
+
+    def _drop_project(self, project_id: str):
+        for task_key in list(self._project_keys.pop(project_id, ())):
+            self._drop(task_key)
+
+    def add_task(self, project_id, task: dict):
+        task_key = task.get("key")
+        if not task_key:
+            return
+        self._put(task_key, {
+            "project_id": project_id,
+            "task_id": task["id"],
+            "title": task.get("name"),
+            "link": (task.get("link") or {}).get("web", {}).get("url"),
+        })
+
+    def search_title(self, partial_title: str) -> tuple[str, dict] | None:
+        """Local substring search over titles, narrowed through the token index."""
+        tokens = TOKEN_PATTERN.findall(partial_title.lower())
+        if not tokens:
+            return None
+        # The first and last token may be cut mid-word; inner ones are whole title tokens
+        whole = tokens[1:-1]
+        candidates = None
+        for token in whole or [max(tokens, key=len)]:
+            keys = self._tokens.get(token, set()) if whole else {
+                key for indexed, keys in self._tokens.items() if token in indexed for key in keys
+            }
+            candidates = keys if candidates is None else candidates & keys
+            if not candidates:
+                return None
+        for task_key in candidates:
+            entry = self.tasks[task_key]
+            if partial_title in (entry.get("title") or ""):
+                return task_key, entry
+        return None
+
+    async def refresh(self, until=None, force: bool = False, satisfied=None) -> int:
+        """Rescan only the projects modified since the last refresh. Returns how many were rescanned.
+
+        ``until(project_id, task)`` may stop the scan early once it returns True;
+        projects not fully read by then keep their old stamp and are rescanned
+        next time. ``force`` also rescans unchanged projects, after the changed ones.
+        With a shared backend the scan waits for any other worker's scan and
+        adopts its result first; it is skipped if ``satisfied()`` then holds.
+        """
+        async with self._refresh_lock:
+            if not self.state.is_shared:
+                return await self._refresh(until, force)
+            while not await self.state.add("zoho:task_index:lock", os.getpid(), ttl=TASK_INDEX_LOCK_TTL):
+                await asyncio.sleep(1)
+            try:
+                await self.sync()
+                if satisfied and satisfied():
+                    return 0
+                return await self._refresh(until, force)
+            finally:
+                await self.state.delete("zoho:task_index:lock", os.getpid())
+
+    async def _refresh(self, until=None, force: bool = False) -> int:
+        projects = await get_zoho_projects()
+        if not projects:
+            return 0  # keep the last good index if Zoho is unavailable
+
+        stamps = {}
+        for proj in projects:
+            stamp = proj.get("updated_date_long") or proj.get("updated_date")
+            stamps[str(proj["id"])] = stamp
+        changed = [
+            project_id for project_id, stamp in stamps.items()
+            if stamp is None or self.projects.get(project_id) != stamp
+        ]
+        if force:
+            changed += [project_id for project_id in stamps if project_id not in changed]
+
+        rescanned = 0
+        seen: dict[str, set] = {}  # project_id -> task keys listed by this scan
+
+        def on_task(project_id: str, task: dict) -> bool:
+            self.add_task(project_id, task)
+            if task.get("key"):
+                seen.setdefault(project_id, set()).add(task["key"])
+                self._forgotten.pop(task["key"], None)  # listed again, so the fresh entry stands
+            return bool(until and until(project_id, task))
+
+        def on_project(project_id: str):
+            nonlocal rescanned
+            # Only a project read to the end may lose the tasks it no longer lists
+            for task_key in self._project_keys.get(project_id, set()) - seen.pop(project_id, set()):
+                self._drop(task_key)
+            self._forgotten = {task_key: forgotten for task_key, forgotten in self._forgotten.items() if forgotten != project_id}
+            self.projects[project_id] = stamps[project_id]
+            rescanned += 1
+
+        stopped = await scan_projects(changed, on_task, on_project) if changed else False
+
+        removed = set(self.projects) - set(stamps)
+        for project_id in removed:
+            self._drop_project(project_id)
+            del self.projects[project_id]
+
+        if rescanned or removed or stopped:
+            print(f"📇 Zoho task index refreshed: {rescanned}/{len(changed)} {'' if force else 'changed '}project(s) rescanned, {len(self.tasks)} tasks indexed.")
+            await asyncio.to_thread(self.save)
+            if self.state.is_shared:
+                await self._publish()
+        return rescanned
+
+    async def _search_keys(self, task_keys: set):
+        # One search request per key; results are only trusted on an exact key match
+        results = await asyncio.gather(*(search_tasks(task_key) for task_key in task_keys), return_exceptions=True)
+        for task_key, found in zip(task_keys, results):
+            if isinstance(found, list):
+                for project_id, task in found:
+                    if task.get("key") == task_key:
+                        self.add_task(project_id, task)
+
+    async def _refresh_for_miss(self, until, satisfied):
+        """Incremental refresh, or at most once per cooldown (across workers when shared) a forced one.
+
+        Zoho does not always bump a project's stamp when a task is added, and
+        search may be off or lag behind, so a miss that only trusted the stamps
+        could never be found.
+        """
+        if self.state.is_shared:
+            force = await self.state.add("zoho:task_index:forced", os.getpid(), ttl=ZOHO_FORCED_SCAN_COOLDOWN)
+        else:
+            force = time.monotonic() >= self._forced_scan_after
+            if force:
+                self._forced_scan_after = time.monotonic() + ZOHO_FORCED_SCAN_COOLDOWN
+        await self.refresh(until, force, satisfied)
+
+    async def find_many(self, task_keys) -> dict:
+        """Resolve several task keys at once: index first, then Zoho search, then one refresh.
+
+        Names that cannot be task keys are ignored, and keys not found are
+        remembered for ZOHO_TASK_MISS_TTL seconds so they cost nothing meanwhile.
+        """
+        now = time.monotonic()
+        task_keys = {task_key for task_key in task_keys if TASK_KEY_PATTERN.fullmatch(task_key)}
+        if not task_keys <= self.tasks.keys():
+            await self.sync()  # another worker may have indexed it already
+        found = {task_key: self.tasks[task_key] for task_key in task_keys if task_key in self.tasks}
+        absent = {task_key for task_key in task_keys - set(found) if self._absent.get(task_key, 0) > now}
+        self.hits += len(found) + len(absent)
+        missing = task_keys - set(found) - absent
+        if not missing:
+            return found
+        self.misses += len(missing)
+        if len(missing) <= ZOHO_SEARCH_MAX_TERMS:
+            await self._search_keys(missing)
+            missing = {task_key for task_key in missing if task_key not in self.tasks}
+        if missing:
+            def until(project_id, task) -> bool:
+                missing.discard(task.get("key"))
+                return not missing  # every key found: stop the scan
+
+            await self._refresh_for_miss(until, lambda: missing <= self.tasks.keys())
+        if missing:
+            now = time.monotonic()
+            self._absent = {task_key: expires for task_key, expires in self._absent.items() if expires > now}
+            self._absent.update(dict.fromkeys(missing, now + ZOHO_TASK_MISS_TTL))
+        return {task_key: self.tasks[task_key] for task_key in task_keys if task_key in self.tasks}
+
+    async def find(self, task_key: str) -> dict | None:
+        """Look up a task key, going to Zoho only on a miss."""
+        return (await self.find_many([task_key])).get(task_key)
+
+    async def find_title(self, partial_title: str) -> tuple[str, dict] | None:
+        """First task whose title contains ``partial_title``, as ``(task_key, entry)``."""
+        match = self.search_title(partial_title)
+        if not match and self.state.is_shared:
+            await self.sync()
+            match = self.search_title(partial_title)
+        if match:
+            self.hits += 1
+            return match
+        self.misses += 1
+        for project_id, task in await search_tasks(partial_title) or []:
+            if partial_title in (task.get("name") or ""):
+                self.add_task(project_id, task)
+                if task.get("key"):
+                    return task["key"], self.tasks[task["key"]]
+        def until(project_id, task) -> bool:
+            return partial_title in (task.get("name") or "")
+
+        await self._refresh_for_miss(until, lambda: self.search_title(partial_title) is not None)
+        return self.search_title(partial_title)
+
+task_index = ZohoTaskIndex(TASK_INDEX_PATH)
+
+async def update_status_with_task_key(task_key: str, target_status_name: str = "Ready for Review", comment: str = f"Nothing to say") -> dict:
+    if not await ensure_portal():
+        return {"success": False, "message": f"❌ Zoho portal '{PORTAL_NAME}' is not available."}
+
+    for attempt in range(2):
+        task = await task_index.find(task_key)
+        if not task:
+            break
+        project_id = task["project_id"]
+        task_id = task["task_id"]
+        task_title = task.get("title")
 
+        result = await update_task_status(project_id, task_id, target_status_name, comment)
+
+        if result["status_code"] == 404 and attempt == 0:
+            # Stale index entry (task deleted or moved); rescan its project and retry once.
+            task_index.forget(task_key)
+            continue
+
+        return {**result, "task_title": task_title}
+
+    return {"success": False, "message": f"❌ Task with key '{task_key}' not found in any project."}
+
+async def update_task_status(project_id, task_id, status_name: str, comment: str = "") -> dict:
+    update_url = f"{ZOHO_API_URL}/portal/{PORTAL_ID}/projects/{project_id}/tasks/{task_id}/"
     headers = {
-        "Authorization": f"Bearer {GIT_REPO_TOKEN}",
-        "Accept": "application/vnd.github+json"
+        'Content-Type': 'application/json'
+    }
+    payload = {"custom_status": STATUS_MAP.get(status_name)}
+    response = await zoho_request("POST", update_url, headers=headers, params=payload)
+    print(f"🔁 Updated Task ID {task_id} to '{status_name}': {response.status_code}")
+
+    await comment_on_task(PORTAL_ID, project_id, task_id, comment)
+    success = response.status_code == 200
+    return {
+        "success": success,
+        "status_code": response.status_code,
+        "project_id": project_id,
+        "task_id": task_id,
+        "message": "✅ Status updated successfully" if success else f"❌ Update failed: {response.text}"
     }
 
-    merged_branches = set()
-    page = 1
+async def update_task_statuses(tasks: dict, status_name: str, comment: str = "") -> dict:
+    """Move many tasks (task key -> {"project_id", "task_id"}) to one status concurrently.
+
+    Each task's status update and comment run back to back; tasks run in
+    parallel up to ZOHO_WRITE_CONCURRENCY. Returns a result per task key.
+    """
+    semaphore = asyncio.Semaphore(ZOHO_WRITE_CONCURRENCY)
+
+    async def run(task_key, info):
+        async with semaphore:
+            try:
+                return task_key, await update_task_status(info["project_id"], info["task_id"], status_name, comment)
+            except Exception as e:
+                return task_key, {"success": False, "status_code": None, "message": f"❌ Update failed: {e}"}
+
+    return dict(await asyncio.gather(*(run(task_key, info) for task_key, info in tasks.items())))
+
+def _parse_github_time(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+# (repo, base branch) -> {"branches": {head_ref: merged_at}, "high_water": newest updated_at already scanned}
+# Bases are mostly short-lived feature branches, so least recently used pairs are evicted
+merged_pr_cache: OrderedDict[tuple, dict] = OrderedDict()
+
+def _merged_pr_entry(repo_full_name: str, base_branch: str) -> dict:
+    cache_key = (repo_full_name, base_branch)
+    entry = merged_pr_cache.get(cache_key)
+    if entry is None:
+        entry = merged_pr_cache[cache_key] = {"branches": {}, "high_water": None}
+        while len(merged_pr_cache) > MERGED_PR_CACHE_SIZE:
+            merged_pr_cache.popitem(last=False)
+    else:
+        merged_pr_cache.move_to_end(cache_key)
+    return entry
+
+def record_merged_pr(repo_full_name: str, base_branch: str, head_branch: str, merged_at: str | None):
+    """Feed a merge seen on the webhook into the cache so the next scan does not have to find it."""
+    if not merged_at:
+        return
+    branches = _merged_pr_entry(repo_full_name, base_branch)["branches"]
+    merged_time = _parse_github_time(merged_at)
+    if head_branch not in branches or branches[head_branch] < merged_time:
+        branches[head_branch] = merged_time
+
+async def get_merged_prs(repo_full_name: str, TARGET_BRANCH: str, DAYS_LOOKBACK: int = 2):
+    since_dt = datetime.now(timezone.utc) - timedelta(days=DAYS_LOOKBACK)
+    entry = _merged_pr_entry(repo_full_name, TARGET_BRANCH)
+
+    # Pulls come newest-updated first: stop at the lookback window or at what an earlier scan already covered
+    stop_at = max(since_dt, entry["high_water"]) if entry["high_water"] else since_dt
+
+    per_page = 100
+    newest_seen = None
+    pages_read = 0
 
-    while True:
-        url = f"https://api.github.com/repos/{repo_full_name}/pulls"
+    async def fetch_page(page_number: int) -> list:
+        nonlocal pages_read
         params = {
             "state": "closed",
             "base": TARGET_BRANCH,
             "sort": "updated",  # GitHub doesn't allow sort=merged
             "direction": "desc",
-            "per_page": 100,
-            "page": page
+            "per_page": per_page,
+            "page": page_number + 1
         }
+        # Revalidated through the GitHub cache: an unchanged first page comes back as a free 304
+        status, prs = await github.get_json(f"{GITHUB_API_BASE}/repos/{repo_full_name}/pulls", params=params, max_age=0, priority="low")
+        if status != 200:
+            raise Exception(f"❌ Failed to list pull requests for {repo_full_name}: {status}")
+        pages_read += 1
+        return prs
+
+    # Incremental scans nearly always stop on the first page, so only the initial scan reads ahead
+    async with aclosing(paginate(fetch_page, per_page, prefetch=entry["high_water"] is None)) as prs:
+        async for pr in prs:
+            updated_time = _parse_github_time(pr["updated_at"])
+            if newest_seen is None or updated_time > newest_seen:
+                newest_seen = updated_time
+            if updated_time < stop_at:
+                break  # nothing newer left
 
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        prs = response.json()
-        
-        if not prs:
-            break
-
-        for pr in prs:
             merged_at = pr.get("merged_at")
             if not merged_at:
                 continue
 
-            merged_time = datetime.fromisoformat(merged_at.replace("Z", "+00:00"))
-            print(f"[DEBUG] PR: {pr['title']}, merged_at: {merged_time.isoformat()}")
+            print(f"[DEBUG] PR: {pr['title']}, merged_at: {merged_at}")
+            record_merged_pr(repo_full_name, TARGET_BRANCH, pr["head"]["ref"], merged_at)
 
-            if merged_time >= since_dt:
-                head_branch = pr["head"]["ref"]
-                merged_branches.add(head_branch)
+    if newest_seen and (entry["high_water"] is None or newest_seen > entry["high_water"]):
+        entry["high_water"] = newest_seen
 
-        # Go to next page
-        page += 1
-        time.sleep(0.5)
+    # Drop merges that fell out of the window; callers always use the same lookback
+    entry["branches"] = {branch: merged_time for branch, merged_time in entry["branches"].items() if merged_time >= since_dt}
+    print(f"[INFO] Merged PR scan for {repo_full_name}:{TARGET_BRANCH} read {pages_read} page(s).")
+    return set(entry["branches"])
 
-    return merged_branches
-
-def Read_For_QA(TARGET_BRANCH: str, repo_full_name: str, DAYS_LOOKBACK: int = 2) -> dict:
-    access_token = token_manager.get_access_token()
+async def Read_For_QA(TARGET_BRANCH: str, repo_full_name: str, DAYS_LOOKBACK: int = 2) -> dict:
+    if not await ensure_portal():
+        print(f"❌ Zoho portal '{PORTAL_NAME}' is not available, skipping Ready For QA.")
+        return None
     print(f"Fetching unique source branches merged into `{TARGET_BRANCH}` in the last {DAYS_LOOKBACK} days...\n")
-    branches = get_merged_prs(repo_full_name, TARGET_BRANCH, DAYS_LOOKBACK)
+    branches = await get_merged_prs(repo_full_name, TARGET_BRANCH, DAYS_LOOKBACK)
     print("🟢 Unique Branches:")
     print(branches)
     if not branches:
         print("⚠️ No task keys found in merged branches.")
         return None
     
-    DATA_BACK = {}
-        
-    projects = get_zoho_projects(access_token)
-    
-    for proj in projects:
-        project_id = proj["id"]
-        tasks = fetch_all_tasks_in_project(access_token, project_id)
-        
-        for task in tasks:
-            task_key = task.get("key")
-            if task_key == TARGET_BRANCH:
-                return None
-            if task_key in branches:
-                DATA_BACK[task_key] = {
-                                            "title" : task.get("name"),
-                                            "link" : task.get("link").get("web").get("url"),
-                                            "project_id" : project_id,
-                                            "task_id" : task["id"]
-                                      }
-        
-    
-    for task_key, info in DATA_BACK.items():
-        update_url = f"https://projectsapi.zoho.in/restapi/portal/{PORTAL_ID}/projects/{info['project_id']}/tasks/{info['task_id']}/"
-        headers = {
-            'Authorization': f'Zoho-oauthtoken {access_token}',
-            'Content-Type': 'application/json'
+    # All merged branches are resolved in one pass over the index (plus at most one refresh)
+    found = await task_index.find_many(branches | {TARGET_BRANCH})
+    if TARGET_BRANCH in found:
+        return None
+    DATA_BACK = {
+        task_key: {
+            "title": task["title"],
+            "link": task["link"],
+            "project_id": task["project_id"],
+            "task_id": task["task_id"]
         }
-        payload = {"custom_status": STATUS_MAP.get("Ready For QA")}
-        response = requests.post(update_url, headers=headers, params=payload)
+        for task_key, task in found.items()
+    }
+
+    results = await update_task_statuses(DATA_BACK, "Ready For QA")
+    for task_key, result in results.items():
+        DATA_BACK[task_key]["updated"] = result["success"]
+    print(f"🟢 Ready For QA: {sum(r['success'] for r in results.values())}/{len(results)} task(s) updated.")
         
     return DATA_BACK
-try:
-    PORTAL_ID = get_portal_id_by_name(token_manager.get_access_token(), PORTAL_NAME)
-    print(f"Portal ID for '{PORTAL_NAME}': {PORTAL_ID}")
-except Exception as e:
-    print(str(e))
+
+async def init_portal() -> bool:
+    global PORTAL_ID
+    try:
+        # Resolved once per deployment when the state backend is shared
+        portal_id = await shared_state.get(f"zoho:portal:{PORTAL_NAME}") if shared_state.is_shared else None
+        if not portal_id:
+            portal_id = await get_portal_id_by_name(PORTAL_NAME)
+            if shared_state.is_shared:
+                await shared_state.set(f"zoho:portal:{PORTAL_NAME}", portal_id)
+        PORTAL_ID = portal_id
+        print(f"Portal ID for '{PORTAL_NAME}': {PORTAL_ID}")
+    except Exception as e:
+        print(str(e))
+    return bool(PORTAL_ID)
+
+_portal_lock = asyncio.Lock()
+
+async def ensure_portal() -> bool:
+    """Resolve PORTAL_ID on first use if the startup bootstrap has not managed to yet."""
+    if PORTAL_ID:
+        return True
+    async with _portal_lock:
+        if not PORTAL_ID:
+            await init_portal()
+    return bool(PORTAL_ID)